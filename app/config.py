@@ -13,6 +13,55 @@ RESIZE_HEIGHT = 1024
 IM_QUALITY = 95
 TIMEOUT_SECS = 600
 IM_MODE = "convert"
+ENGINE = "magick"  # "magick" (ImageMagick CLI) or "pillow" (in-process, falls back to ImageMagick per file)
+# Upright sources that already fit are copied byte-for-byte; hardlink them instead (same filesystem only)
+LINK_ORIGINALS = False
+# Content-addressed store of resized outputs; Resized/ files are hardlinks into it so photos shared
+# between locations are stored once (None = plain copies). Must be on the same filesystem as BASE.
+OUTPUT_STORE_DIR = BASE / ".store"
+
+# Skip re-hashing sources whose (path, size, mtime, inode) matches a recorded row.
+# PARANOID_SLICES > 0 re-hashes 1/N of those files per run, rotating daily (full sweep every N days).
+PARANOID_SLICES = 0
+
+# Content hash for new rows: "sha256", "blake2b" or "xxh3" (needs xxhash). Non-SHA256 hashes are stored
+# as "algo:hex", so existing SHA256 rows stay valid: a new file whose size and quick fingerprint match an
+# older row is hashed with that row's algorithm, so dedupe against it keeps working. Full hashes run on
+# HASH_THREADS background threads, HASH_PREFETCH candidates ahead of the file being converted (0 = inline).
+HASH_ALGO = "sha256"
+HASH_THREADS = 2
+HASH_PREFETCH = 8
+
+# Parallel conversions (1 = sequential); all DB access then goes through a single writer thread
+WORKERS = 1
 
 # Database
 DB_PATH = Path("/mnt/photo-frame/photo_conversions.db")
+# Converter runs buffer DB rows and write them in one transaction every N rows or T milliseconds
+DB_BATCH_ROWS = 200
+DB_BATCH_MS = 2000
+# Leases on new/changed sources so overlapping cron runs (or several nodes sharing BASE and the DB) split
+# the work instead of converting the same files; heartbeated every TTL/3, so a crashed worker's files
+# are taken over after at most this long (0 = off). Nodes need a DB with working locks: SQLite WAL does
+# not work across a network filesystem, so share it as a bind mount of one host (e.g. LXC), not over NFS.
+CLAIM_TTL_SECS = 600
+# Per-directory scan cache so unchanged folders under Original/ are not listed again (None = full walk)
+SCAN_MANIFEST_DIR = DB_PATH.parent / ".scan-manifest"
+
+# Prometheus textfile for node-exporter's textfile collector, rewritten every METRICS_TEXTFILE_SECS
+# during a run and at its end; "{location}" is replaced so per-location cron runs don't overwrite
+# each other (None = off). e.g. "/var/lib/node_exporter/textfile_collector/photo_resizer_{location}.prom"
+METRICS_TEXTFILE = None
+METRICS_TEXTFILE_SECS = 15
+
+# main.py --profile: one report directory per run (pstats, collapsed stacks, ImageMagick timings)
+PROFILE_DIR = DB_PATH.parent / ".profiles"
+
+# Dashboard previews (/api/thumb): rendered once, evicted least-recently-used past the cap
+THUMB_CACHE_DIR = DB_PATH.parent / ".thumbs"
+THUMB_CACHE_MAX_MB = 512
+
+# Watch mode (main.py --watch)
+WATCH_SETTLE_SECS = 5        # a new file must keep the same size/mtime this long before converting
+WATCH_RECONCILE_SECS = 3600  # full scan + dedupe pass to catch missed events
+WATCH_POLL_SECS = 60         # scan interval when inotify is unavailable (or --watch-poll)
@@ -1,13 +1,68 @@
 from __future__ import annotations
-import time, shutil
+import os, socket, time, shutil, zlib, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from decimal import Decimal, getcontext
-from app.config import RESIZE_WIDTH, RESIZE_HEIGHT, IM_MODE, EXTS
+from typing import Iterable, Iterator
+from app.config import (
+    RESIZE_WIDTH, RESIZE_HEIGHT, IM_QUALITY, IM_MODE, EXTS, PARANOID_SLICES, WORKERS, LINK_ORIGINALS,
+    DB_BATCH_ROWS, DB_BATCH_MS, HASH_ALGO, HASH_THREADS, HASH_PREFETCH, OUTPUT_STORE_DIR,
+    METRICS_TEXTFILE_SECS, CLAIM_TTL_SECS,
+)
 from app.planner import Planner
-from app.imaging import ImageEngine
-from app.database_operations import PhotoDB
+from app.imaging import ImageEngine, fit_resize
+from app.probe import probe
+from app.hashing import Hasher, algo_of, hash_file, quick_fingerprint
+from app.store import OutputStore, materialize, render_key
+from app.timing import STAGES, StageTimer
+from app.metrics import ConverterMetrics
+from app.database_operations import LeaseKeeper, PhotoDB, SerializedDB
 
-getcontext().prec = 28
+
+def _fmt_duration(secs: int) -> str:
+    if secs >= 3600:
+        h, rem = divmod(secs, 3600); m, s = divmod(rem, 60)
+        return f"{h}h {m}m {s}s"
+    if secs >= 60:
+        m, s = divmod(secs, 60)
+        return f"{m}m {s}s"
+    return f"{secs}s"
+
+
+def _round_robin(streams: list[Iterator]) -> Iterator:
+    """One item from each stream in turn, dropping streams as they run out."""
+    active = deque(iter(s) for s in streams)
+    while active:
+        stream = active.popleft()
+        try:
+            item = next(stream)
+        except StopIteration:
+            continue
+        yield item
+        active.append(stream)
+
+
+class _KeyedLocks:
+    """One mutex per key, created on demand and dropped when nobody holds or waits on it."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: dict = {}
+
+    @contextmanager
+    def hold(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
 
 
 class Converter:
@@ -15,227 +70,591 @@ class Converter:
     #     self.planner = planner
     #     self.engine = engine
     #     self.db_path = db_path
-    def __init__(self, planner, engine, db_path, make_logger):
+    def __init__(self, planner, engine, db_path, make_logger, paranoid_slices: int = PARANOID_SLICES,
+                 workers: int = WORKERS, hash_algo: str = HASH_ALGO, store_dir: Path | None = OUTPUT_STORE_DIR,
+                 metrics_textfile: Path | None = None, claim_ttl: int = CLAIM_TTL_SECS):
         self.planner = planner
         self.engine = engine
         self.db_path = db_path
+        self.workers = max(1, workers)
+        # sources with the same stem share temp/output paths; serialize those across workers
+        self._path_locks = _KeyedLocks()
+        # copies of one photo (e.g. in several locations) are serialized on their content (recorded hash, or
+        # size + quick fingerprint) so the first copy converts and the others link its output
+        self._content_locks = _KeyedLocks()
+        # paranoid mode: re-hash 1/N of the stat-unchanged files, a different slice each day
+        self.paranoid_slices = paranoid_slices
+        # full hashes run ahead of conversion on background threads
+        self.hasher = Hasher(hash_algo, HASH_THREADS)
+        # outputs are hardlinked into a content-addressed store so dedupe hits can link instead of copy
+        self.store = OutputStore(store_dir) if store_dir else None
+        self.render_key = render_key(RESIZE_WIDTH, RESIZE_HEIGHT, getattr(engine, "quality", IM_QUALITY))
+        # per-stage time summed over a run (reported with the run totals)
+        self._stage_totals: dict[str, float] = {}
+        self._stage_lock = threading.Lock()
+        # Prometheus metrics, written for node-exporter's textfile collector during and after each run
+        self.metrics = ConverterMetrics()
+        self.metrics.workers.set(self.workers)
+        self.metrics_textfile = metrics_textfile
+        self._metrics_written = 0.0
+        self._metrics_lock = threading.Lock()
+        # leases on sources being worked on, shared with other runs/nodes through the DB (0 = off)
+        self.claim_ttl = claim_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._claimed: set[str] = set()
+        # candidates in the current run, known once the scan finishes (progress shows #idx/? until then)
+        self._scan_total: int | None = None
+        # called with (path, status, duration_ms, stage columns) for every finished file, e.g. by the profiler
+        self.on_file = None
         # one child per class; add static context if useful
         self.log: logging.Logger = make_logger("converter")
 
-    @staticmethod
-    def _log_db(db: PhotoDB, *, end_ts: float, status: str, filename: str, file_ext: str,
+    def _log_db(self, db: PhotoDB, *, timer: StageTimer, end_ts: float, status: str, filename: str, file_ext: str,
                 full_path: Path, output_path: Path, src_hash: str | None,
                 orig_w: int | None, orig_h: int | None, new_w: int | None, new_h: int | None,
                 out_size: int | None, duration_ms: int, im_args: str, error: str | None,
-                src_size: int | None = None, src_mtime: int | None = None) -> None:
+                src_size: int | None = None, src_mtime: int | None = None, src_inode: int | None = None,
+                src_qfp: str | None = None, im_mode: str = IM_MODE) -> None:
+        self._observe(timer, status=status, full_path=full_path, src_size=src_size, out_size=out_size,
+                      duration_ms=duration_ms)
+        t0 = time.perf_counter()
         db.record(
             converted_at=int(end_ts), status=status,
             src_name=filename, src_ext=file_ext,
             src_fullpath=str(full_path), dst_fullpath=str(output_path),
             src_hash=src_hash, orig_width=orig_w, orig_height=orig_h,
             new_width=new_w, new_height=new_h, out_size_bytes=out_size,
-            duration_ms=duration_ms, im_mode=IM_MODE, im_args=im_args, error=error,
-            src_size=src_size, src_mtime=src_mtime
+            duration_ms=duration_ms, im_mode=im_mode, im_args=im_args, error=error,
+            src_size=src_size, src_mtime=src_mtime, src_inode=src_inode, src_qfp=src_qfp,
+            location=self.planner.location_for(full_path), stage_ms=timer.columns()
         )
+        # the row carries everything up to the write; the write (mostly a buffer append, now and then a
+        # batch flush) only shows in the run totals as db_write
+        self._tally_ms("db_write", (time.perf_counter() - t0) * 1000)
+
+    def _observe(self, timer: StageTimer, *, status: str, full_path: Path, src_size: int | None,
+                 out_size: int | None, duration_ms: int) -> None:
+        """Add one finished file to the run's stage totals and metrics."""
+        location = self.planner.location_for(full_path) or ""
+        m = self.metrics
+        m.files.inc(location=location, status=status)
+        if status == "SUCCESS":
+            m.bytes_in.inc(src_size or 0, location=location)
+            m.bytes_out.inc(out_size or 0, location=location)
+        m.file_seconds.observe(duration_ms / 1000, status=status)
+        for stage, ms in timer.ms.items():
+            self._tally_ms(stage, ms)
+            m.stage_seconds.observe(ms / 1000, stage=stage)
+        if self.on_file:
+            self.on_file(full_path, status, duration_ms, timer.columns())
+
+    def _tally_ms(self, stage: str, ms: float) -> None:
+        with self._stage_lock:
+            self._stage_totals[stage] = self._stage_totals.get(stage, 0.0) + ms
+
+    def claim(self, db: PhotoDB, full_path: Path) -> bool:
+        """
+        Lease full_path for this run; False if another run or node is working on it. Runs release their
+        leases when they end; callers outside a run (dashboard jobs) keep a LeaseKeeper open for the
+        heartbeat and release() each path once its row is committed.
+        """
+        key = str(full_path)
+        if not self.claim_ttl or key in self._claimed:
+            return True
+        try:
+            won = db.claim(key, self.owner, self.claim_ttl)
+        except Exception as e:
+            self.log.warning("Could not claim %s (processing it anyway): %s", full_path, e)
+            return True
+        if not won:
+            self.log.info("%s is claimed by another worker; skipping", full_path.name)
+            self.metrics.claims_skipped.inc(location=self.planner.location_for(full_path) or "")
+            return False
+        self._claimed.add(key)
+        return True
+
+    def release(self, db: PhotoDB, full_path: Path) -> None:
+        key = str(full_path)
+        if key in self._claimed:
+            self._claimed.discard(key)
+            db.release_claim(key, self.owner)
+
+    def _paranoid_pick(self, full_path: Path) -> bool:
+        if self.paranoid_slices <= 0:
+            return False
+        today = int(time.time() // 86400)
+        return zlib.crc32(str(full_path).encode()) % self.paranoid_slices == today % self.paranoid_slices
+
+    def _source_hash(self, db: PhotoDB, timer: StageTimer, full_path: Path, src_size: int,
+                     known: str | None, src_qfp: str | None = None) -> tuple[str | None, str | None]:
+        """
+        (hash, quick fingerprint) of the source. The recorded hash is trusted while the stat fingerprint
+        matches (unless paranoid mode picks this file). When the quick fingerprint rules out every recorded
+        hash, the full hash is left pending (None) so it can finish in the background during conversion;
+        collect it with _late_hash. `known` is the recorded hash for the stat fingerprint (see _lookup);
+        a quick fingerprint already computed by _content_key is reused.
+        """
+        if known and not self._paranoid_pick(full_path):
+            self.log.debug("Stat fingerprint unchanged for %s; reusing recorded hash", full_path)
+            return known, None
+
+        try:
+            if known:
+                with timer.stage("hash"):
+                    src_hash = hash_file(full_path, algo_of(known))  # compare like with like
+                if src_hash != known:
+                    self.log.warning("Paranoid check: %s changed content without a stat change (was %s, now %s)",
+                                     full_path, known[:12], src_hash[:12])
+                return src_hash, None
+
+            if src_qfp is None:
+                with timer.stage("hash"):
+                    src_qfp = quick_fingerprint(full_path, src_size)
+            with timer.stage("db"):
+                algos = db.duplicate_algos(src_size, src_qfp)
+            if not algos:
+                self.log.debug("Quick fingerprint of %s matches nothing recorded; skipping dedupe", full_path)
+                return None, src_qfp
+            # rows hashed before a --hash-algo change only match a hash made the same way
+            algo = self.hasher.algo if self.hasher.algo in algos else sorted(algos)[0]
+            with timer.stage("hash"):
+                return self.hasher.result(full_path, algo), src_qfp
+        except Exception:
+            self.log.debug("Hash computation failed for %s (continuing without hash)", full_path)
+            return known, None
+
+    def _late_hash(self, timer: StageTimer, full_path: Path, src_hash: str | None, src_qfp: str | None) -> str | None:
+        """Collect a hash _source_hash left pending; anything else passes through."""
+        if src_hash or not src_qfp:
+            return src_hash
+        try:
+            with timer.stage("hash"):
+                return self.hasher.result(full_path)
+        except Exception:
+            self.log.debug("Hash computation failed for %s (continuing without hash)", full_path)
+            return None
+
+    def _dedupe_source(self, existing_dst: Path, src_hash: str, ext: str) -> Path | None:
+        """
+        Store entry for this content (adopting existing_dst if there is none yet), else existing_dst.
+        None when existing_dst is a hardlinked original (LINK_ORIGINALS): it must be copied, not linked.
+        """
+        if not self.store:
+            return existing_dst
+        entry = self.store.lookup(src_hash, self.render_key, ext)
+        if not entry and existing_dst.stat().st_nlink > 1:
+            return None  # linked to something outside the store, i.e. a user's original
+        if not entry and self.store.adopt(existing_dst, src_hash, self.render_key, ext):
+            entry = self.store.path_for(src_hash, self.render_key, ext)
+        return entry or existing_dst
+
+    def _adopt_output(self, output_path: Path, src_hash: str | None, ext: str) -> None:
+        if self.store and src_hash and output_path.exists():
+            self.store.adopt(output_path, src_hash, self.render_key, ext)
+
+    @staticmethod
+    def _place_original(src: Path, dst: Path) -> str:
+        if LINK_ORIGINALS:
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError:
+                pass  # cross-device or unsupported; copy instead
+        shutil.copy2(src, dst)
+        return "copy"
+
+    @staticmethod
+    def _lookup(db: PhotoDB, full_path: Path, timer: StageTimer | None = None) -> tuple[os.stat_result, str | None]:
+        """(stat, recorded hash for that stat fingerprint or None): the one stat and lookup a file gets."""
+        st = full_path.stat()
+        with timer.stage("db") if timer else nullcontext():
+            known = db.find_by_stat(str(full_path), st.st_size, int(st.st_mtime), st.st_ino)
+        return st, known
+
+    def _content_key(self, timer: StageTimer, full_path: Path, st: os.stat_result, known: str | None):
+        """
+        Lock key shared by copies of the same photo: the recorded hash while the stat fingerprint is known,
+        else (size, quick fingerprint). Returns (key, quick fingerprint or None).
+        """
+        if known:
+            return known, None
+        with timer.stage("hash"):
+            src_qfp = quick_fingerprint(full_path, st.st_size)
+        return (st.st_size, src_qfp), src_qfp
+
+    def process_one(self, *, db: PhotoDB, idx: int, total: int | None, full_path: Path, watch_dir: Path, out_dir: Path,
+                    seen: tuple[os.stat_result, str | None] | None = None) -> int:
+        """Process one candidate; `seen` is its _lookup result when the caller already has it (scan prefetch)."""
+        out_ext = self.planner.mapped_ext(full_path.suffix)
+        _, output_path, _ = self.planner.expected_paths(full_path, watch_dir, out_dir, out_ext)
+        self.metrics.workers_busy.inc()
+        try:
+            timer = StageTimer()
+            try:
+                st, known = seen or self._lookup(db, full_path, timer)
+                key, src_qfp = self._content_key(timer, full_path, st, known)
+            except OSError as e:
+                # listed by the scan (or settled in watch mode), then deleted or renamed
+                self.log.warning("%s is gone or unreadable; skipping (%s)", full_path, e)
+                return 0
+            with self._path_locks.hold(output_path), self._content_locks.hold(key):
+                return self._process(db=db, idx=idx, total=total, full_path=full_path, watch_dir=watch_dir,
+                                     out_dir=out_dir, timer=timer, st=st, known=known, src_qfp=src_qfp)
+        finally:
+            self.metrics.workers_busy.dec()
+            self.export_metrics()
 
-    def process_one(self, *, db: PhotoDB, idx: int, total: int, full_path: Path, watch_dir: Path, out_dir: Path) -> int:
+    def export_metrics(self, force: bool = False) -> None:
+        """Rewrite the metrics textfile, at most every METRICS_TEXTFILE_SECS unless forced."""
+        if not self.metrics_textfile:
+            return
+        with self._metrics_lock:
+            now = time.monotonic()
+            if not force and now - self._metrics_written < METRICS_TEXTFILE_SECS:
+                return
+            self._metrics_written = now
+            try:
+                self.metrics.registry.write_textfile(self.metrics_textfile)
+            except OSError as e:
+                self.log.warning("Could not write metrics to %s: %s", self.metrics_textfile, e)
+
+    def _process(self, *, db: PhotoDB, idx: int, total: int | None, full_path: Path, watch_dir: Path, out_dir: Path,
+                 timer: StageTimer, st: os.stat_result, known: str | None, src_qfp: str | None = None) -> int:
         start_ts = time.time()
         start_ms = int(round(start_ts * 1000))
-        st = full_path.stat()
-        src_size, src_mtime = st.st_size, int(st.st_mtime)
+        total = total or self._scan_total
+        src_size, src_mtime, src_inode = st.st_size, int(st.st_mtime), st.st_ino
 
         file_ext = full_path.suffix
         out_ext = self.planner.mapped_ext(file_ext)
-        resized_path, output_path, auto_oriented_path = self.planner.expected_paths(full_path, watch_dir, out_dir, out_ext)
+        resized_path, output_path, _ = self.planner.expected_paths(full_path, watch_dir, out_dir, out_ext)
 
-        try:
-            src_hash = self.engine.sha256_file(full_path)
-        except Exception:
-            src_hash = None
-            self.log.debug("SHA256 computation failed for %s (continuing without hash)", full_path)
+        src_hash, src_qfp = self._source_hash(db, timer, full_path, src_size, known, src_qfp)
 
         # ALREADY_DONE
-        if src_hash and db.already_done_here(src_hash, str(output_path)) and output_path.exists():
+        with timer.stage("db"):
+            done = src_hash and db.already_done_here(src_hash, str(output_path))
+        if done and output_path.exists():
             end_ts = time.time()
-            self.log.info("#%d/%d %s: ALREADY_DONE (updating last_checked_at)", idx, total, full_path.name)
+            self.log.info("#%d/%s %s: ALREADY_DONE (updating last_checked_at)", idx, total or "?", full_path.name)
             # Instead of inserting a new row, just update the timestamp on the existing one
-            db.update_last_checked(src_hash, str(output_path), int(end_ts))
+            with timer.stage("db"):
+                db.update_last_checked(src_hash, str(output_path), int(end_ts))
+            self._observe(timer, status="ALREADY_DONE", full_path=full_path, src_size=src_size, out_size=None,
+                          duration_ms=int(round(time.time() * 1000)) - start_ms)
+            return int(time.time() - start_ts)
+
+        # needs work: make sure no other run or node is on it (new files were claimed before hashing)
+        if not self.claim(db, full_path):
             return int(time.time() - start_ts)
 
         # SKIPPED_DUP: reuse elsewhere
-        existing_dst = db.find_existing_converted(src_hash) if src_hash else None
+        with timer.stage("db"):
+            existing_dst = db.find_existing_converted(src_hash) if src_hash else None
         if existing_dst:
             try:
                 if existing_dst.resolve() == output_path.resolve():
                     end_ts = time.time()
                     dur = int(round(end_ts * 1000)) - start_ms
                     out_size = output_path.stat().st_size if output_path.exists() else None
-                    self.log.info("#%d/%d %s: ALREADY_DONE (dedupe hit is this destination)", idx, total, full_path.name)
-                    self._log_db(db, end_ts=end_ts, status="ALREADY_DONE", filename=full_path.name, file_ext=file_ext,
+                    self.log.info("#%d/%s %s: ALREADY_DONE (dedupe hit is this destination)", idx, total or "?", full_path.name)
+                    self._log_db(db, timer=timer, end_ts=end_ts, status="ALREADY_DONE", filename=full_path.name, file_ext=file_ext,
                                  full_path=full_path, output_path=output_path, src_hash=src_hash,
                                  orig_w=None, orig_h=None, new_w=None, new_h=None, out_size=out_size,
                                  duration_ms=dur, im_args="(already converted here; dedupe hit)", error=None,
-                                 src_size=src_size, src_mtime=src_mtime)
+                                 src_size=src_size, src_mtime=src_mtime, src_inode=src_inode, src_qfp=src_qfp)
                     return int(time.time() - start_ts)
 
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                if output_path.exists():
-                    output_path.unlink()
-                shutil.copy2(existing_dst, output_path)
+                with timer.stage("place"):
+                    source = self._dedupe_source(existing_dst, src_hash, out_ext)
+                    if source:
+                        how = materialize(source, output_path)
+                    else:  # fresh bytes, so the store entry is never the other location's original
+                        output_path.parent.mkdir(parents=True, exist_ok=True)
+                        output_path.unlink(missing_ok=True)
+                        shutil.copy2(existing_dst, output_path)
+                        how = "copy"
+                        self._adopt_output(output_path, src_hash, out_ext)
                 out_size = output_path.stat().st_size if output_path.exists() else None
 
                 end_ts = time.time()
                 dur = int(round(end_ts * 1000)) - start_ms
-                self.log.info("#%d/%d %s: SKIPPED_DUP (copied from existing: %s)", idx, total, full_path.name, existing_dst)
-                self._log_db(db, end_ts=end_ts, status="SKIPPED_DUP", filename=full_path.name, file_ext=file_ext,
+                self.log.info("#%d/%s %s: SKIPPED_DUP (%s of existing: %s)", idx, total or "?", full_path.name, how, existing_dst)
+                self._log_db(db, timer=timer, end_ts=end_ts, status="SKIPPED_DUP", filename=full_path.name, file_ext=file_ext,
                              full_path=full_path, output_path=output_path, src_hash=src_hash,
                              orig_w=None, orig_h=None, new_w=None, new_h=None, out_size=out_size,
-                             duration_ms=dur, im_args="(skipped duplicate; copied existing)", error=None,
-                             src_size=src_size, src_mtime=src_mtime)
+                             duration_ms=dur, im_args=f"(skipped duplicate; {how} of existing)", error=None,
+                             src_size=src_size, src_mtime=src_mtime, src_inode=src_inode, src_qfp=src_qfp)
                 return int(time.time() - start_ts)
             except Exception as e:
-                self.log.warning("Failed to copy existing conversion (%s) -> %s: %s", existing_dst, output_path, e)
+                self.log.warning("Failed to reuse existing conversion (%s) -> %s: %s", existing_dst, output_path, e)
                 # fall through to full convert
 
-        # Normal convert
         filename = full_path.name
-        try:
-            self.engine.auto_orient(full_path, auto_oriented_path)
-        except Exception as e:
-            end_ts = time.time()
-            self._log_db(db, end_ts=end_ts, status="FAILED", filename=filename, file_ext=file_ext,
-                         full_path=full_path, output_path=output_path, src_hash=src_hash,
-                         orig_w=None, orig_h=None, new_w=None, new_h=None, out_size=None,
-                         duration_ms=int(round(end_ts * 1000)) - start_ms,
-                         im_args="-auto-orient", error=str(e),
-                         src_size=src_size, src_mtime=src_mtime)
-            self.log.error("Auto-orient failed for %s: %s", full_path, e)
-            return int(time.time() - start_ts)
 
+        # Already small enough and upright: keep the original bytes instead of decoding/re-encoding
+        with timer.stage("probe"):
+            probed = probe(full_path)
+        if probed and probed.orientation == 1 and out_ext.lower() == file_ext.lower() \
+                and fit_resize(probed.width, probed.height, RESIZE_WIDTH, RESIZE_HEIGHT) is None:
+            try:
+                with timer.stage("place"):
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                    if output_path.exists():
+                        output_path.unlink()
+                    how = self._place_original(full_path, output_path)
+                out_size = output_path.stat().st_size
+                src_hash = self._late_hash(timer, full_path, src_hash, src_qfp)
+                if how == "copy":  # a hardlinked original must not become a shared store entry
+                    with timer.stage("place"):
+                        self._adopt_output(output_path, src_hash, out_ext)
+
+                end_ts = time.time()
+                dur = int(round(end_ts * 1000)) - start_ms
+                self.log.info("#%d/%s %s: original size %dx%d, no resize or rotation needed (%s)",
+                              idx, total or "?", filename, probed.width, probed.height, how)
+                self._log_db(db, timer=timer, end_ts=end_ts, status="SUCCESS", filename=filename, file_ext=file_ext,
+                             full_path=full_path, output_path=output_path, src_hash=src_hash,
+                             orig_w=probed.width, orig_h=probed.height, new_w=probed.width, new_h=probed.height,
+                             out_size=out_size, duration_ms=dur, im_args=f"(byte {how}; no resize needed)",
+                             error=None, src_size=src_size, src_mtime=src_mtime, src_inode=src_inode,
+                             src_qfp=src_qfp, im_mode="copy")
+                return int(time.time() - start_ts)
+            except Exception as e:
+                self.log.warning("Byte copy of %s -> %s failed: %s", full_path, output_path, e)
+                # fall through to full convert
+
+        # Normal convert: auto-orient, measure and resize in one engine call (no full-size temp image)
         try:
-            orig_w, orig_h = self.engine.identify_size(auto_oriented_path)
+            with timer.stage("render"):
+                rendered = self.engine.render(full_path, resized_path, RESIZE_WIDTH, RESIZE_HEIGHT)
         except Exception as e:
+            src_hash = self._late_hash(timer, full_path, src_hash, src_qfp)
             end_ts = time.time()
-            self._log_db(db, end_ts=end_ts, status="FAILED", filename=filename, file_ext=file_ext,
+            self._log_db(db, timer=timer, end_ts=end_ts, status="FAILED", filename=filename, file_ext=file_ext,
                          full_path=full_path, output_path=output_path, src_hash=src_hash,
                          orig_w=None, orig_h=None, new_w=None, new_h=None, out_size=None,
                          duration_ms=int(round(end_ts * 1000)) - start_ms,
-                         im_args="-identify", error=str(e),
-                         src_size=src_size, src_mtime=src_mtime)
+                         im_args="-auto-orient -resize", error=str(e),
+                         src_size=src_size, src_mtime=src_mtime, src_inode=src_inode, src_qfp=src_qfp)
             try:
-                auto_oriented_path.unlink(missing_ok=True)
+                resized_path.unlink(missing_ok=True)
             except Exception:
                 pass
-            self.log.error("Identify size failed for %s: %s", auto_oriented_path, e)
+            self.log.error("Conversion failed for %s: %s", full_path, e)
             return int(time.time() - start_ts)
 
-        self.log.info("#%d/%d %s: original size %dx%d", idx, total, filename, orig_w, orig_h)
+        orig_w, orig_h = rendered.orig_w, rendered.orig_h
+        new_w, new_h = rendered.new_w, rendered.new_h
+        self.log.info("#%d/%s %s: original size %dx%d", idx, total or "?", filename, orig_w, orig_h)
 
         status = "SUCCESS"
         error_text = None
-        new_w = new_h = None
         out_size = None
-        im_args_used = ""
+
+        if rendered.percent is not None:
+            self.log.info("Resized %s → %s (new %dx%d, %s%%)", full_path, resized_path, new_w, new_h, rendered.percent)
+            im_args_used = rendered.im_args
+        else:
+            self.log.info("Copying without resize: %s → %s", full_path, output_path)
+            im_args_used = "(copy without resize)"
 
         try:
-            if (orig_w > RESIZE_WIDTH) or (orig_h > RESIZE_HEIGHT):
-                sw = Decimal(RESIZE_WIDTH) / Decimal(orig_w)
-                sh = Decimal(RESIZE_HEIGHT) / Decimal(orig_h)
-                scale = sh if sw < sh else sw
-                scale += Decimal("0.01")
-                percent = scale * Decimal("100")
-                new_w = int((Decimal(orig_w) * scale).to_integral_value())
-                new_h = int((Decimal(orig_h) * scale).to_integral_value())
-                self.log.info("Resizing %s → %s (new %dx%d, %s%%)", full_path, resized_path, new_w, new_h, percent)
-                im_args_used = self.engine.resize_percent(auto_oriented_path, resized_path, percent)
-                if output_path.exists():
-                    output_path.unlink()
-                shutil.move(str(resized_path), str(output_path))
-                self.log.debug("Removed temp resized file %s after move", resized_path)
-                self.log.info("Resized → %s", output_path)
-            else:
-                self.log.info("Copying without resize: %s → %s", full_path, output_path)
-                shutil.copy2(auto_oriented_path, resized_path)
+            with timer.stage("place"):
                 if output_path.exists():
                     output_path.unlink()
                 shutil.move(str(resized_path), str(output_path))
-                new_w, new_h = orig_w, orig_h
-                im_args_used = "(copy without resize)"
+            self.log.debug("Removed temp resized file %s after move", resized_path)
+            self.log.info("Resized → %s", output_path)
         except Exception as e:
             status = "FAILED"
             error_text = str(e)
             self.log.error("Conversion failed for %s: %s", full_path, e)
-        finally:
             try:
-                auto_oriented_path.unlink(missing_ok=True)
+                resized_path.unlink(missing_ok=True)
             except Exception:
                 pass
 
         if output_path.exists():
             out_size = output_path.stat().st_size
+        src_hash = self._late_hash(timer, full_path, src_hash, src_qfp)
+        if status == "SUCCESS":
+            with timer.stage("place"):
+                self._adopt_output(output_path, src_hash, out_ext)
 
         end_ts = time.time()
         dur_ms = int(round(end_ts * 1000)) - start_ms
         elapsed = int(end_ts - start_ts)
 
-        self._log_db(db, end_ts=end_ts, status=status, filename=filename, file_ext=file_ext,
+        self._log_db(db, timer=timer, end_ts=end_ts, status=status, filename=filename, file_ext=file_ext,
                      full_path=full_path, output_path=output_path, src_hash=src_hash,
                      orig_w=orig_w, orig_h=orig_h, new_w=new_w, new_h=new_h,
                      out_size=out_size, duration_ms=dur_ms,
                      im_args=im_args_used, error=error_text,
-                     src_size=src_size, src_mtime=src_mtime)
+                     src_size=src_size, src_mtime=src_mtime, src_inode=src_inode, src_qfp=src_qfp,
+                     im_mode=rendered.mode)
 
-        if elapsed >= 60:
-            m, s = divmod(elapsed, 60)
-            self.log.info("Elapsed: %dm %ds", m, s)
-        else:
-            self.log.info("Elapsed: %ds", elapsed)
+        self.log.info("Elapsed: %s", _fmt_duration(elapsed))
 
         return elapsed
 
-    def cleanup_temp_files(self, watch_dir: Path):
-        # scan all subfolders
-        for pattern in ("*_auto_oriented.*", "*_resized.*"):
-            for f in watch_dir.rglob(pattern):
-                name = f.name
-                if "_auto_oriented" in name:
-                    base_stem = name.replace("_auto_oriented", "").rsplit(".", 1)[0]
-                elif "_resized" in name:
-                    base_stem = name.replace("_resized", "").rsplit(".", 1)[0]
-                else:
-                    continue
+    def cleanup_temp_file(self, f: Path):
+        """Remove a leftover *_auto_oriented / *_resized artifact whose original no longer exists."""
+        name = f.name
+        if "_auto_oriented" in name:
+            base_stem = name.replace("_auto_oriented", "").rsplit(".", 1)[0]
+        elif "_resized" in name:
+            base_stem = name.replace("_resized", "").rsplit(".", 1)[0]
+        else:
+            return
+
+        has_original = any((f.parent / f"{base_stem}{ext}").exists() for ext in EXTS)
+        if not has_original:
+            try:
+                self.log.info("Removing leftover temp file: %s", f)
+                f.unlink()
+            except Exception as e:
+                self.log.debug("Failed to remove %s: %s", f, e)
 
-                has_original = any((f.parent / f"{base_stem}{ext}").exists() for ext in EXTS)
-                if not has_original:
-                    try:
-                        self.log.info("Removing leftover temp file: %s", f)
-                        f.unlink()
-                    except Exception as e:
-                        self.log.debug("Failed to remove %s: %s", f, e)
+    def _preload(self, db: PhotoDB) -> None:
+        t0 = time.time()
+        rows = db.preload()
+        self.log.info("Loaded %d prior conversion(s) into the dedupe index in %.2fs", rows, time.time() - t0)
 
     def run(self, location_key: str):
         watch_dir, out_dir = self.planner.dirs_for_location(location_key)
         self.log.info("Initializing resizing run for location '%s'...", location_key)
 
-        # Clean up before doing anything
-        self.cleanup_temp_files(watch_dir)
+        self._convert(location_key, str(watch_dir), self._scan(watch_dir, out_dir), preload=True)
 
-        candidates = self.planner.list_candidates(watch_dir)
-        total = len(candidates)
-        self.log.info("Found %d candidate(s) in %s", total, watch_dir)
+    def run_all(self, location_keys: Iterable[str] | None = None):
+        """
+        Several locations (default: all) in one run: one DB open and dedupe index, and candidates taken
+        round-robin from each location's scan so no location waits behind another. A photo present in
+        several locations is converted once; the other copies become SKIPPED_DUP links to that output.
+        """
+        keys = list(location_keys or self.planner.locations)
+        if len(keys) == 1:
+            return self.run(keys[0])
+        self.log.info("Initializing resizing run for locations %s...", ", ".join(keys))
+        streams = [self._scan(*self.planner.dirs_for_location(key)) for key in keys]
+        self._convert("all", f"{len(keys)} locations", _round_robin(streams), preload=True)
 
+    def _scan(self, watch_dir: Path, out_dir: Path) -> Iterator[tuple[Path, Path, Path]]:
+        # Candidates stream in while the scan runs; leftover temp files are cleaned as they are found
+        for p in self.planner.iter_candidates(watch_dir, on_temp=self.cleanup_temp_file):
+            yield p, watch_dir, out_dir
+
+    def process_paths(self, location_key: str, paths: Iterable[Path]):
+        """Convert specific files (watch mode) without a directory scan or a full index preload."""
+        watch_dir, out_dir = self.planner.dirs_for_location(location_key)
+        items = ((p, watch_dir, out_dir) for p in paths if self.planner.is_candidate(p) and p.exists())
+        self._convert(location_key, str(watch_dir), items, preload=False)
+
+    def _prefetching(self, db: PhotoDB, items: Iterable[tuple[Path, Path, Path]], where: str):
+        """
+        Yield (candidate, watch_dir, out_dir, seen) HASH_PREFETCH behind the scan, queueing a background full
+        hash for each candidate whose stat fingerprint is unknown, so reading the next files overlaps the
+        current conversion. Such new or changed files are claimed first; those another worker holds are left
+        out. `seen` is the candidate's stat and lookup (see _lookup), handed on so it is not repeated (None if
+        the stat failed). The candidate count is logged and used for progress (#idx/total) once the scan is done.
+        """
+        window: deque = deque()
+        count = 0
+        for item in items:
+            p = item[0]
+            seen = None
+            try:
+                seen = self._lookup(db, p)
+                if not seen[1]:
+                    if not self.claim(db, p):
+                        continue
+                    # a won claim loads rows other workers committed since preload; one may have finished it
+                    if self.claim_ttl:
+                        seen = self._lookup(db, p)
+                    if not seen[1]:
+                        self.hasher.prefetch(p)
+            except OSError:
+                pass  # process_one tries again and reports it
+            window.append((*item, seen))
+            count += 1
+            if len(window) > HASH_PREFETCH:
+                yield window.popleft()
+        self._scan_total = count
+        self.log.info("Found %d candidate(s) in %s", count, where)
+        yield from window
+
+    def _convert(self, label: str, where: str, items: Iterable[tuple[Path, Path, Path]], *, preload: bool):
+        """Process (candidate, watch_dir, out_dir) items; `label` tags the run metrics, `where` the log lines."""
+        total = 0
+        run_start = time.time()
         total_elapsed = 0
-        with PhotoDB(self.db_path) as db:
-            for idx, p in enumerate(candidates, start=1):
-                total_elapsed += self.process_one(db=db, idx=idx, total=total,
-                                                  full_path=p, watch_dir=watch_dir, out_dir=out_dir)
+        self._stage_totals = {}
+        self.metrics.run_started.set(run_start, location=label)
+        self._claimed = set()
+        self._scan_total = None
+        # leases are released when the keeper exits, after the DB below has committed this run's rows
+        keeper = LeaseKeeper(self.db_path, self.owner, self.claim_ttl, log=self.log) if self.claim_ttl else nullcontext()
+        with keeper:
+            try:
+                if self.workers > 1:
+                    # ImageMagick does the heavy lifting in subprocesses, so threads are enough to fill the cores;
+                    # every DB call goes through the single SerializedDB writer thread.
+                    with SerializedDB(self.db_path, batch_rows=DB_BATCH_ROWS, batch_ms=DB_BATCH_MS) as db, \
+                            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="convert") as pool:
+                        if preload:
+                            self._preload(db)
+                        # keep submissions just ahead of the workers so hash prefetch stays close to them
+                        slots = threading.BoundedSemaphore(self.workers * 2)
+
+                        def done(_):
+                            self.metrics.queue_depth.dec()
+                            slots.release()
+
+                        futures = []
+                        try:
+                            candidates = self._prefetching(db, items, where)
+                            for idx, (p, watch_dir, out_dir, seen) in enumerate(candidates, start=1):
+                                slots.acquire()
+                                self.metrics.queue_depth.inc()
+                                fut = pool.submit(self.process_one, db=db, idx=idx, total=None,
+                                                  full_path=p, watch_dir=watch_dir, out_dir=out_dir, seen=seen)
+                                fut.add_done_callback(done)
+                                futures.append(fut)
+                            total = len(futures)
+                            for fut in as_completed(futures):
+                                total_elapsed += fut.result()
+                        except BaseException:
+                            # e.g. SIGTERM: drop queued files, let running ones finish, then flush the DB
+                            for fut in futures:
+                                fut.cancel()
+                            raise  # cancelled futures run `done` too, so queue_depth returns to 0
+                else:
+                    with PhotoDB(self.db_path, batch_rows=DB_BATCH_ROWS, batch_ms=DB_BATCH_MS) as db:
+                        if preload:
+                            self._preload(db)
+                        for idx, (p, watch_dir, out_dir, seen) in enumerate(self._prefetching(db, items, where), start=1):
+                            total_elapsed += self.process_one(db=db, idx=idx, total=None, full_path=p,
+                                                              watch_dir=watch_dir, out_dir=out_dir, seen=seen)
+                            total = idx
+                            db.flush_due()  # a slow next file must not hold back rows the dashboard waits for
+            finally:
+                self.hasher.discard()
+        self._claimed = set()
+        self._scan_total = None
+
+        run_end = time.time()
+        m = self.metrics
+        m.run_finished.set(run_end, location=label)
+        m.run_seconds.set(round(run_end - run_start, 3), location=label)
+        m.run_files.set(total, location=label)
+        self.export_metrics(force=True)
 
         # final logs
-        if total_elapsed >= 3600:
-            h, rem = divmod(total_elapsed, 3600); m, s = divmod(rem, 60)
-            self.log.info("Total time: %dh %dm %ds", h, m, s)
-        elif total_elapsed >= 60:
-            m, s = divmod(total_elapsed, 60)
-            self.log.info("Total time: %dm %ds", m, s)
-        else:
-            self.log.info("Total time: %ds", total_elapsed)
+        wall = int(time.time() - run_start)
+        self.log.info("Total time: %s (wall clock %s, %d worker(s))",
+                      _fmt_duration(total_elapsed), _fmt_duration(wall), self.workers)
+        if self._stage_totals:
+            self.log.info("Stage totals: %s", ", ".join(
+                f"{stage} {self._stage_totals[stage] / 1000:.1f}s"
+                for stage in (*STAGES, "db_write") if stage in self._stage_totals))
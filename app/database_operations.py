@@ -1,8 +1,16 @@
 from __future__ import annotations
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Optional
 
+from app.config import LOCATIONS
+from app.hashing import algo_of
+from app.timing import STAGES
+
 _SCHEMA = """
 DROP INDEX IF EXISTS ux_conversions_src_hash;
 
@@ -26,23 +34,115 @@ CREATE TABLE IF NOT EXISTS conversions (
   error TEXT,
   src_size INTEGER,
   src_mtime INTEGER,
+  src_inode INTEGER,
+  src_qfp TEXT,                            -- quick fingerprint (head/tail digest) for dedupe pre-filtering
+  location TEXT,                           -- LOCATIONS key the source belongs to
   saved_percent INTEGER,                   -- e.g. 90 (means 90% saved)
   saved_mb REAL,                           -- e.g. 9.25 (MB saved)
-  last_checked_at INTEGER                  -- Timestamp of last verification
+  last_checked_at INTEGER,                 -- Timestamp of last verification
+  hash_ms INTEGER,                         -- per-stage wall time (see app/timing.py); NULL = stage not reached
+  db_ms INTEGER,                           -- dedupe lookups; the batched row write is run-level (db_write)
+  probe_ms INTEGER,
+  render_ms INTEGER,
+  place_ms INTEGER
 );
 CREATE INDEX IF NOT EXISTS idx_conversions_src_hash ON conversions(src_hash);
 CREATE INDEX IF NOT EXISTS idx_conversions_src_path ON conversions(src_fullpath);
 CREATE INDEX IF NOT EXISTS idx_conversions_when ON conversions(converted_at);
 CREATE INDEX IF NOT EXISTS idx_hash_dst ON conversions(src_hash, dst_fullpath);
+CREATE INDEX IF NOT EXISTS idx_conversions_src_stat ON conversions(src_fullpath, src_size, src_mtime);
+
+-- Running totals per location/status for the dashboard, maintained by record(); see rebuild_rollups()
+CREATE TABLE IF NOT EXISTS stats_rollup (
+  location TEXT NOT NULL,                  -- LOCATIONS key, '' when unknown
+  status TEXT NOT NULL,
+  files INTEGER NOT NULL DEFAULT 0,
+  src_bytes INTEGER NOT NULL DEFAULT 0,
+  out_bytes INTEGER NOT NULL DEFAULT 0,
+  saved_mb REAL NOT NULL DEFAULT 0,
+  last_at INTEGER,                         -- newest converted_at
+  PRIMARY KEY (location, status)
+);
+
+-- First SUCCESS per source hash, so history rows for duplicates get dimensions by key lookup
+CREATE TABLE IF NOT EXISTS canonical_success (
+  src_hash TEXT PRIMARY KEY,
+  src_fullpath TEXT NOT NULL,
+  orig_width INTEGER,
+  orig_height INTEGER,
+  new_width INTEGER,
+  new_height INTEGER
+);
+
+-- Work leases, so overlapping runs and other nodes sharing the DB split the candidates; see claim()
+CREATE TABLE IF NOT EXISTS claims (
+  src_fullpath TEXT PRIMARY KEY,
+  owner TEXT NOT NULL,                     -- host:pid of the claiming run
+  expires_at REAL NOT NULL                 -- unix time; an expired lease (crashed worker) can be taken over
+);
+CREATE INDEX IF NOT EXISTS idx_claims_owner ON claims(owner);
 """
 
 _INSERT_SQL = """
 INSERT INTO conversions (
   converted_at, status, src_name, src_ext, src_fullpath, dst_fullpath,
   src_hash, orig_width, orig_height, new_width, new_height, out_size_bytes,
-  duration_ms, im_mode, im_args, error, src_size, src_mtime,
-  saved_percent, saved_mb
-) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+  duration_ms, im_mode, im_args, error, src_size, src_mtime, src_inode, src_qfp,
+  saved_percent, saved_mb, location, hash_ms, db_ms, probe_ms, render_ms, place_ms
+) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO stats_rollup (location, status, files, src_bytes, out_bytes, saved_mb, last_at)
+VALUES (?,?,?,?,?,?,?)
+ON CONFLICT(location, status) DO UPDATE SET
+  files = files + excluded.files,
+  src_bytes = src_bytes + excluded.src_bytes,
+  out_bytes = out_bytes + excluded.out_bytes,
+  saved_mb = saved_mb + excluded.saved_mb,
+  last_at = MAX(COALESCE(last_at, 0), excluded.last_at)
+"""
+
+_REBUILD_ROLLUPS = """
+INSERT INTO stats_rollup (location, status, files, src_bytes, out_bytes, saved_mb, last_at)
+SELECT COALESCE(location, ''), status, COUNT(*), COALESCE(SUM(src_size), 0), COALESCE(SUM(out_size_bytes), 0),
+       COALESCE(SUM(saved_mb), 0), MAX(converted_at)
+FROM conversions
+GROUP BY 1, 2
+"""
+
+_INSERT_CANONICAL = """
+INSERT OR IGNORE INTO canonical_success
+  (src_hash, src_fullpath, orig_width, orig_height, new_width, new_height)
+VALUES (?,?,?,?,?,?)
+"""
+
+_REBUILD_CANONICAL = """
+INSERT OR IGNORE INTO canonical_success
+  (src_hash, src_fullpath, orig_width, orig_height, new_width, new_height)
+SELECT src_hash, src_fullpath, orig_width, orig_height, new_width, new_height
+FROM conversions
+WHERE status = 'SUCCESS' AND src_hash IS NOT NULL
+ORDER BY converted_at, id
+"""
+
+_NEEDS_REBUILD = """
+SELECT (EXISTS(SELECT 1 FROM conversions) AND NOT EXISTS(SELECT 1 FROM stats_rollup))
+    OR (EXISTS(SELECT 1 FROM conversions WHERE status = 'SUCCESS' AND src_hash IS NOT NULL)
+        AND NOT EXISTS(SELECT 1 FROM canonical_success))
+"""
+
+# Sources whose most recent row is FAILED (a later success or dedupe means it was fixed)
+_SELECT_FAILED_SOURCES = """
+SELECT c.src_fullpath
+FROM conversions c
+WHERE c.status = 'FAILED' AND (? IS NULL OR c.location = ?)
+  AND NOT EXISTS (
+    SELECT 1 FROM conversions n
+    WHERE n.src_fullpath = c.src_fullpath AND n.id > c.id AND n.status != 'FAILED'
+  )
+GROUP BY c.src_fullpath
+ORDER BY MAX(c.id)
 """
 
 _SELECT_EXISTING = """
@@ -53,11 +153,130 @@ ORDER BY converted_at DESC
 LIMIT 10
 """
 
+# Stat fingerprint fast path: a row recorded for the same path/size/mtime(/inode) tells us the hash
+# without reading the file again. Rows written before src_inode existed match on path/size/mtime only.
+_SELECT_BY_STAT = """
+SELECT src_hash
+FROM conversions
+WHERE src_fullpath = ? AND src_size = ? AND src_mtime = ?
+  AND (src_inode = ? OR src_inode IS NULL)
+  AND src_hash IS NOT NULL
+ORDER BY converted_at DESC
+LIMIT 1
+"""
+
+_UPDATE_LAST_CHECKED = """
+UPDATE conversions SET last_checked_at=?
+WHERE src_hash=? AND dst_fullpath=? AND status IN ('SUCCESS', 'SKIPPED_DUP')
+"""
+
+# Bulk read for the run-scoped in-memory index; oldest first so later rows win.
+_SELECT_INDEX = """
+SELECT src_fullpath, src_size, src_mtime, src_inode, src_qfp, src_hash, status, dst_fullpath
+FROM conversions
+WHERE src_hash IS NOT NULL
+ORDER BY converted_at, id
+"""
+
+# Take the lease if it is free, expired or already ours; rowcount 0 means another worker holds it.
+_CLAIM = """
+INSERT INTO claims (src_fullpath, owner, expires_at) VALUES (?,?,?)
+ON CONFLICT(src_fullpath) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+WHERE claims.owner = excluded.owner OR claims.expires_at < ?
+"""
+
+# Index rows of one path, to catch up on work other processes committed after preload()
+_SELECT_INDEX_FOR_PATH = """
+SELECT src_fullpath, src_size, src_mtime, src_inode, src_qfp, src_hash, status, dst_fullpath
+FROM conversions
+WHERE src_fullpath = ? AND src_hash IS NOT NULL
+ORDER BY converted_at, id
+"""
+
+# Columns added after the first release; created on open for older databases.
+_MIGRATED_COLUMNS = {
+    "last_checked_at": "INTEGER",
+    "src_inode": "INTEGER",
+    "src_qfp": "TEXT",
+    "location": "TEXT",
+    "hash_ms": "INTEGER",
+    "db_ms": "INTEGER",
+    "probe_ms": "INTEGER",
+    "render_ms": "INTEGER",
+    "place_ms": "INTEGER",
+}
+
+# Indexes over migrated columns; created after _ensure_columns so older databases have them.
+_POST_MIGRATION_SQL = """
+CREATE INDEX IF NOT EXISTS idx_conversions_size_qfp ON conversions(src_size, src_qfp);
+CREATE INDEX IF NOT EXISTS idx_conversions_loc_when ON conversions(location, converted_at);
+CREATE INDEX IF NOT EXISTS idx_conversions_loc_status ON conversions(location, status);
+"""
+
+# Algorithms of the recorded hashes a file with this size/quick fingerprint could match (see algo_of).
+# Rows from before src_qfp existed only rule out other sizes.
+_SELECT_DUP_ALGOS = """
+SELECT DISTINCT CASE WHEN instr(src_hash, ':') > 0 THEN substr(src_hash, 1, instr(src_hash, ':') - 1)
+                     ELSE 'sha256' END
+FROM conversions
+WHERE src_size = ? AND (src_qfp = ? OR src_qfp IS NULL) AND src_hash IS NOT NULL
+"""
+
+class _ConversionIndex:
+    """
+    In-memory copy of what the per-file dedupe lookups need, loaded once per run by PhotoDB.preload()
+    and kept current by PhotoDB.record(). Answers the same questions as _SELECT_BY_STAT,
+    already_done_here and _SELECT_EXISTING without a query per file.
+    """
+
+    def __init__(self):
+        self.by_path: dict[str, tuple[int | None, int | None, int | None, str]] = {}
+        self.done: set[tuple[str, str]] = set()  # (src_hash, dst) already in place: SUCCESS or SKIPPED_DUP
+        self.dsts: dict[str, list[str]] = {}  # src_hash -> SUCCESS destinations, newest first
+        self.qfps: dict[int | None, dict[str | None, set[str]]] = {}  # src_size -> quick fingerprint -> hash algos
+
+    def add(self, src_fullpath: str, src_size: int | None, src_mtime: int | None, src_inode: int | None,
+            src_qfp: str | None, src_hash: str, status: str, dst_fullpath: str | None) -> None:
+        self.by_path[src_fullpath] = (src_size, src_mtime, src_inode, src_hash)
+        self.qfps.setdefault(src_size, {}).setdefault(src_qfp, set()).add(algo_of(src_hash))
+        if status in ("SUCCESS", "SKIPPED_DUP") and dst_fullpath:
+            self.done.add((src_hash, dst_fullpath))
+        if status == "SUCCESS" and dst_fullpath:
+            dsts = self.dsts.setdefault(src_hash, [])
+            if dst_fullpath in dsts:
+                dsts.remove(dst_fullpath)
+            dsts.insert(0, dst_fullpath)
+
+    def hash_for_stat(self, src_fullpath: str, src_size: int, src_mtime: int, src_inode: int | None) -> Optional[str]:
+        rec = self.by_path.get(src_fullpath)
+        if not rec or rec[0] != src_size or rec[1] != src_mtime or rec[2] not in (None, src_inode):
+            return None
+        return rec[3]
+
+    def duplicate_algos(self, src_size: int, src_qfp: str) -> set[str]:
+        seen = self.qfps.get(src_size, {})
+        return seen.get(src_qfp, set()) | seen.get(None, set())
+
+
 class PhotoDB:
-    def __init__(self, db_path: Path | str, read_only: bool = False):
+    """
+    batch_rows > 1 turns on write batching: record()/update_last_checked() rows are buffered and
+    written with executemany in one transaction once batch_rows rows or batch_ms have accumulated,
+    and always on flush()/close(). A crash loses at most one batch; those files are simply redone.
+    """
+
+    def __init__(self, db_path: Path | str, read_only: bool = False, batch_rows: int = 1, batch_ms: int = 0):
         self.path = Path(db_path)
         self.read_only = read_only
         self.conn: Optional[sqlite3.Connection] = None
+        self.batch_rows = batch_rows
+        self.batch_ms = batch_ms
+        self._pending_inserts: list[tuple] = []
+        self._pending_checks: list[tuple] = []
+        self._pending_rollups: dict[tuple[str, str], list] = {}
+        self._pending_canonical: list[tuple] = []
+        self._batch_started: Optional[float] = None
+        self._index: Optional[_ConversionIndex] = None
 
     def __enter__(self) -> "PhotoDB":
         self.open()
@@ -84,54 +303,215 @@ class PhotoDB:
             
             # Migration: ensure last_checked_at column exists
             self._ensure_columns()
+            self.conn.executescript(_POST_MIGRATION_SQL)
+            if self.conn.execute(_NEEDS_REBUILD).fetchone()[0]:
+                self.rebuild_rollups()  # first open since the derived tables were introduced
         
         if not self.read_only:
             self.conn.commit()
 
     def _ensure_columns(self):
-        """Check if last_checked_at exists, invoke ALTER TABLE if not."""
+        """Add any columns from _MIGRATED_COLUMNS that are missing (ALTER TABLE)."""
         try:
             cur = self.conn.execute("PRAGMA table_info(conversions)")
             current_cols = {row[1] for row in cur.fetchall()}
-            if "last_checked_at" not in current_cols:
-                self.conn.execute("ALTER TABLE conversions ADD COLUMN last_checked_at INTEGER")
+            for col, col_type in _MIGRATED_COLUMNS.items():
+                if col not in current_cols:
+                    self.conn.execute(f"ALTER TABLE conversions ADD COLUMN {col} {col_type}")
+            if "location" not in current_cols:
+                self._backfill_locations()
         except Exception:
             pass  # If table doesn't exist yet, it was just created by executescript above which has the col
 
+    def _backfill_locations(self) -> None:
+        """Fill location for rows written before the column existed, matching '/<Folder>/' in the path."""
+        with self.conn:
+            for key, folder in LOCATIONS.items():
+                self.conn.execute(
+                    "UPDATE conversions SET location = ? WHERE location IS NULL AND src_fullpath LIKE ?",
+                    (key, f"%/{folder}/%"),
+                )
+
     def close(self) -> None:
         if self.conn:
-            self.conn.close()
-            self.conn = None
+            try:
+                self.flush()
+            finally:
+                self.conn.close()
+                self.conn = None
+
+    def flush(self) -> None:
+        """Write all buffered rows in a single transaction."""
+        if not (self._pending_inserts or self._pending_checks):
+            return
+        with self.conn:  # one transaction; commit on success, rollback on error
+            if self._pending_inserts:
+                self.conn.executemany(_INSERT_SQL, self._pending_inserts)
+            if self._pending_checks:
+                self.conn.executemany(_UPDATE_LAST_CHECKED, self._pending_checks)
+            if self._pending_rollups:
+                self.conn.executemany(_UPSERT_ROLLUP, [k + tuple(v) for k, v in self._pending_rollups.items()])
+            if self._pending_canonical:
+                self.conn.executemany(_INSERT_CANONICAL, self._pending_canonical)
+        self._pending_inserts.clear()
+        self._pending_checks.clear()
+        self._pending_rollups.clear()
+        self._pending_canonical.clear()
+        self._batch_started = None
+
+    def _buffer(self, pending: list[tuple], row: tuple) -> None:
+        pending.append(row)
+        if self._batch_started is None:
+            self._batch_started = time.monotonic()
+        size = len(self._pending_inserts) + len(self._pending_checks)
+        if size >= self.batch_rows or (time.monotonic() - self._batch_started) * 1000 >= self.batch_ms:
+            self.flush()
+
+    def flush_due(self) -> Optional[float]:
+        """
+        Flush if the oldest buffered row is batch_ms old; otherwise return the seconds until it will be
+        (None when nothing is buffered). For idle stretches, when no new row arrives to trigger the flush.
+        """
+        if self._batch_started is None:
+            return None
+        wait = self.batch_ms / 1000 - (time.monotonic() - self._batch_started)
+        if wait > 0:
+            return wait
+        self.flush()
+        return None
+
+    def _read_own_writes(self) -> None:
+        # dedupe lookups must see conversions recorded earlier in this run
+        if self._pending_inserts:
+            self.flush()
+
+    def rebuild_rollups(self) -> None:
+        """
+        Recompute stats_rollup and canonical_success from the conversions table
+        (after deleting or editing rows by hand).
+        """
+        self.flush()
+        with self.conn:
+            self.conn.execute("DELETE FROM stats_rollup")
+            self.conn.execute(_REBUILD_ROLLUPS)
+            self.conn.execute("DELETE FROM canonical_success")
+            self.conn.execute(_REBUILD_CANONICAL)
+
+    def preload(self) -> int:
+        """
+        Load the dedupe index into memory (one bulk read); later lookups on this PhotoDB are answered
+        from it and record() keeps it current. Returns the number of rows loaded.
+        """
+        self._read_own_writes()
+        index = _ConversionIndex()
+        rows = 0
+        for row in self.conn.execute(_SELECT_INDEX):
+            index.add(*row)
+            rows += 1
+        self._index = index
+        return rows
 
     def find_existing_converted(self, src_hash: str) -> Optional[Path]:
         if not src_hash:
             return None
-        cur = self.conn.execute(_SELECT_EXISTING, (src_hash,))
-        for (dst,) in cur.fetchall():
+        if self._index:
+            candidates = self._index.dsts.get(src_hash, [])[:10]
+        else:
+            self._read_own_writes()
+            candidates = [dst for (dst,) in self.conn.execute(_SELECT_EXISTING, (src_hash,)).fetchall()]
+        for dst in candidates:
             if dst and Path(dst).exists():
                 return Path(dst)
         return None
 
+    def find_by_stat(self, src_fullpath: str, src_size: int, src_mtime: int, src_inode: int | None) -> Optional[str]:
+        """Return the recorded hash for an unchanged source file, or None if its stat fingerprint is new."""
+        if self._index:
+            return self._index.hash_for_stat(src_fullpath, src_size, src_mtime, src_inode)
+        self._read_own_writes()
+        cur = self.conn.execute(_SELECT_BY_STAT, (src_fullpath, src_size, src_mtime, src_inode))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def duplicate_algos(self, src_size: int, src_qfp: str) -> set[str]:
+        """
+        Hash algorithms of the recorded hashes that could equal this file's. Empty means none can, so dedupe
+        checks can be skipped; otherwise the file must be hashed with one of these to be comparable.
+        """
+        if self._index:
+            return self._index.duplicate_algos(src_size, src_qfp)
+        self._read_own_writes()
+        return {algo for (algo,) in self.conn.execute(_SELECT_DUP_ALGOS, (src_size, src_qfp))}
+
     def already_done_here(self, src_hash: str, expected_dst: str) -> bool:
+        if self._index:
+            return (src_hash, expected_dst) in self._index.done
+        self._read_own_writes()
         cur = self.conn.execute(
-            "SELECT 1 FROM conversions WHERE src_hash=? AND dst_fullpath=? AND status='SUCCESS' LIMIT 1",
+            "SELECT 1 FROM conversions WHERE src_hash=? AND dst_fullpath=? "
+            "AND status IN ('SUCCESS', 'SKIPPED_DUP') LIMIT 1",
             (src_hash, expected_dst),
         )
         return cur.fetchone() is not None
 
+    def latest_row(self, src_fullpath: str) -> Optional[tuple[int, str]]:
+        """(id, status) of the newest row for a source."""
+        self._read_own_writes()
+        row = self.conn.execute(
+            "SELECT id, status FROM conversions WHERE src_fullpath = ? ORDER BY id DESC LIMIT 1", (src_fullpath,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def failed_sources(self, location: Optional[str] = None) -> list[str]:
+        """Sources whose latest conversion failed, optionally for one location key."""
+        self._read_own_writes()
+        return [path for (path,) in self.conn.execute(_SELECT_FAILED_SOURCES, (location, location))]
+
     def update_last_checked(self, src_hash: str, expected_dst: str, ts: int) -> None:
         """Update the last_checked_at timestamp for an existing successful conversion."""
-        self.conn.execute(
-            "UPDATE conversions SET last_checked_at=? WHERE src_hash=? AND dst_fullpath=? AND status='SUCCESS'",
-            (ts, src_hash, expected_dst)
-        )
+        if self.batch_rows > 1:
+            self._buffer(self._pending_checks, (ts, src_hash, expected_dst))
+            return
+        self.conn.execute(_UPDATE_LAST_CHECKED, (ts, src_hash, expected_dst))
+        self.conn.commit()
+
+    def claim(self, src_fullpath: str, owner: str, ttl: float) -> bool:
+        """
+        Lease a source for `ttl` seconds; False if another owner holds an unexpired lease. Committed at once
+        (not batched) so other processes see it. A won lease also reloads the path's index rows, since the
+        previous holder may have finished it after this run's preload().
+        """
+        now = time.time()
+        won = self.conn.execute(_CLAIM, (src_fullpath, owner, now + ttl, now)).rowcount > 0
+        self.conn.commit()
+        if won and self._index:
+            for row in self.conn.execute(_SELECT_INDEX_FOR_PATH, (src_fullpath,)):
+                self._index.add(*row)
+        return won
+
+    def heartbeat(self, owner: str, ttl: float) -> int:
+        """Extend all of owner's leases by `ttl` seconds from now; returns how many it holds."""
+        n = self.conn.execute("UPDATE claims SET expires_at = ? WHERE owner = ?", (time.time() + ttl, owner)).rowcount
+        self.conn.commit()
+        return n
+
+    def release_claim(self, src_fullpath: str, owner: str) -> None:
+        """Drop one of owner's leases. Call after the path's row is committed."""
+        self.conn.execute("DELETE FROM claims WHERE src_fullpath = ? AND owner = ?", (src_fullpath, owner))
+        self.conn.commit()
+
+    def release_claims(self, owner: str) -> None:
+        """Drop owner's leases (and any expired ones). Call after owner's rows are committed."""
+        self.conn.execute("DELETE FROM claims WHERE owner = ? OR expires_at < ?", (owner, time.time()))
         self.conn.commit()
 
     def record(self, *, converted_at: int, status: str, src_name: str, src_ext: str,
                src_fullpath: str, dst_fullpath: str | None, src_hash: str | None,
                orig_width: int | None, orig_height: int | None, new_width: int | None, new_height: int | None,
                out_size_bytes: int | None, duration_ms: int, im_mode: str, im_args: str, error: str | None,
-               src_size: int | None = None, src_mtime: int | None = None, commit: bool = True) -> None:
+               src_size: int | None = None, src_mtime: int | None = None, src_inode: int | None = None,
+               src_qfp: str | None = None, location: str | None = None,
+               stage_ms: dict[str, int | None] | None = None, commit: bool = True) -> None:
         # compute savings
         saved_percent = None
         saved_mb = None
@@ -140,11 +520,151 @@ class PhotoDB:
                 saved_percent = int(round((src_size - out_size_bytes) / src_size * 100))
             saved_mb = round((src_size - out_size_bytes) / (1024 * 1024), 2)
 
-        self.conn.execute(_INSERT_SQL, (
+        row = (
             converted_at, status, src_name, src_ext, src_fullpath, dst_fullpath,
             src_hash, orig_width, orig_height, new_width, new_height, out_size_bytes,
-            duration_ms, im_mode, im_args, error, src_size, src_mtime,
-            saved_percent, saved_mb
-        ))
+            duration_ms, im_mode, im_args, error, src_size, src_mtime, src_inode, src_qfp,
+            saved_percent, saved_mb, location,
+            *[(stage_ms or {}).get(f"{s}_ms") for s in STAGES]
+        )
+        if self._index and src_hash:
+            self._index.add(src_fullpath, src_size, src_mtime, src_inode, src_qfp, src_hash, status, dst_fullpath)
+        key = (location or "", status)
+        delta = [1, src_size or 0, out_size_bytes or 0, saved_mb or 0.0, converted_at]
+        canonical = None
+        if status == "SUCCESS" and src_hash:
+            canonical = (src_hash, src_fullpath, orig_width, orig_height, new_width, new_height)
+        if self.batch_rows > 1:
+            if canonical:
+                self._pending_canonical.append(canonical)
+            acc = self._pending_rollups.get(key)
+            if acc:
+                acc[:4] = [a + d for a, d in zip(acc[:4], delta[:4])]
+                acc[4] = max(acc[4], converted_at)
+            else:
+                self._pending_rollups[key] = delta
+            self._buffer(self._pending_inserts, row)
+            return
+        self.conn.execute(_INSERT_SQL, row)
+        self.conn.execute(_UPSERT_ROLLUP, key + tuple(delta))
+        if canonical:
+            self.conn.execute(_INSERT_CANONICAL, canonical)
         if commit:
-            self.conn.commit()
\ No newline at end of file
+            self.conn.commit()
+
+
+class SerializedDB:
+    """
+    PhotoDB proxy for parallel runs: one dedicated thread owns the connection and executes
+    every call (reads and writes) in order, so SQLite never sees concurrent writers.
+    Method calls block until the writer thread has run them and return their result.
+    """
+
+    def __init__(self, db_path: Path | str, **db_kwargs):
+        self.path = Path(db_path)
+        self.db_kwargs = db_kwargs
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "SerializedDB":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self) -> None:
+        if self._thread:
+            return
+        ready: Future = Future()
+        self._thread = threading.Thread(target=self._serve, args=(ready,), name="photodb-writer", daemon=True)
+        self._thread.start()
+        ready.result()  # re-raise open/migration errors in the caller
+
+    def close(self) -> None:
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _serve(self, ready: Future) -> None:
+        db = PhotoDB(self.path, **self.db_kwargs)
+        try:
+            db.open()
+        except BaseException as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+        try:
+            while True:
+                # wake up when the write batch is due even if no call comes in (e.g. during a long render)
+                try:
+                    item = self._queue.get(timeout=db.flush_due())
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+                name, args, kwargs, fut = item
+                try:
+                    fut.set_result(getattr(db, name)(*args, **kwargs))
+                except BaseException as e:
+                    fut.set_exception(e)
+        finally:
+            db.close()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(PhotoDB, name, None)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            if not self._thread:
+                raise RuntimeError("SerializedDB is not open")
+            fut: Future = Future()
+            self._queue.put((name, args, kwargs, fut))
+            return fut.result()
+
+        return call
+
+
+class LeaseKeeper:
+    """
+    Heartbeats owner's claims every ttl/3 seconds on its own connection and thread while a run converts,
+    and releases them on exit. Exit after the run's PhotoDB is closed, so the rows are committed before
+    another worker can take the paths over.
+    """
+
+    def __init__(self, db_path: Path | str, owner: str, ttl: float, log=None):
+        self.path = Path(db_path)
+        self.owner = owner
+        self.ttl = ttl
+        self.log = log
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._done.clear()
+        self._thread = threading.Thread(target=self._serve, name="photodb-leases", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._done.set()
+        self._thread.join()
+        self._thread = None
+
+    def _serve(self) -> None:
+        db = PhotoDB(self.path)
+        try:
+            db.open()
+            while not self._done.wait(self.ttl / 3):
+                try:
+                    db.heartbeat(self.owner, self.ttl)
+                except sqlite3.Error as e:
+                    if self.log:
+                        self.log.warning("Lease heartbeat failed (will retry): %s", e)
+            db.release_claims(self.owner)
+        except sqlite3.Error as e:
+            if self.log:
+                self.log.warning("Could not release leases of %s (they expire in %ss): %s", self.owner, self.ttl, e)
+        finally:
+            db.close()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+import hashlib, os, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+try:
+    import xxhash  # pip: xxhash
+    _HAS_XXHASH = True
+except Exception:
+    _HAS_XXHASH = False
+
+HASH_ALGOS = ("sha256", "blake2b", "xxh3")
+_CHUNK = 1 << 20
+_QUICK_BLOCK = 64 * 1024
+
+
+def _new_hash(algo: str):
+    if algo == "sha256":
+        return hashlib.sha256()
+    if algo == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algo == "xxh3":
+        if not _HAS_XXHASH:
+            raise SystemExit("xxhash not installed. Need 'pip install xxhash' for HASH_ALGO='xxh3'.")
+        return xxhash.xxh3_128()
+    raise ValueError(f"Unknown hash algorithm: {algo}")
+
+
+def algo_of(src_hash: str) -> str:
+    """Algorithm a stored hash was made with: SHA256 rows are bare hex, others are 'algo:hex'."""
+    return src_hash.split(":", 1)[0] if ":" in src_hash else "sha256"
+
+
+def hash_file(path: Path, algo: str = "sha256") -> str:
+    """
+    Content hash of `path`. SHA256 stays bare hex (as every existing row has it); other algorithms
+    are prefixed, so hashes from different algorithms never compare equal.
+    """
+    h = _new_hash(algo)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest() if algo == "sha256" else f"{algo}:{h.hexdigest()}"
+
+
+def quick_fingerprint(path: Path, size: int) -> str:
+    """Cheap pre-filter: digest of the first and last 64 KiB. Equal content implies equal fingerprint."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(_QUICK_BLOCK))
+        if size > 2 * _QUICK_BLOCK:
+            f.seek(-_QUICK_BLOCK, os.SEEK_END)
+            h.update(f.read(_QUICK_BLOCK))
+    return h.hexdigest()
+
+
+class Hasher:
+    """
+    Full-file hashing with background prefetch: prefetch() queues a file on a small thread pool
+    (file reads release the GIL) so its hash is ready, or nearly, when result() is called after
+    conversion has already been running. result() hashes inline when nothing was prefetched.
+    """
+
+    def __init__(self, algo: str = "sha256", threads: int = 0):
+        _new_hash(algo)  # fail fast on unknown/unavailable algorithms
+        self.algo = algo
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hash") if threads > 0 else None
+        self._futures: dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, path: Path) -> None:
+        if not self._pool:
+            return
+        with self._lock:
+            if path not in self._futures:
+                self._futures[path] = self._pool.submit(hash_file, path, self.algo)
+
+    def result(self, path: Path, algo: Optional[str] = None) -> str:
+        with self._lock:
+            fut = self._futures.pop(path, None)
+        if algo and algo != self.algo:
+            if fut:
+                fut.cancel()
+            return hash_file(path, algo)
+        return fut.result() if fut else hash_file(path, self.algo)
+
+    def discard(self) -> None:
+        """Drop prefetched hashes nobody collected (files that vanished or were skipped)."""
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for fut in futures.values():
+            fut.cancel()
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        self._futures.clear()
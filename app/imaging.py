@@ -1,26 +1,91 @@
 from __future__ import annotations
 from pathlib import Path
 from decimal import Decimal
-import subprocess, hashlib
+from typing import Callable, NamedTuple, Optional
+import subprocess, hashlib, time
 from shutil import which
+from app.probe import probe
+
+try:
+    from PIL import Image, ImageOps  # pip: Pillow
+    _HAS_PIL = True
+except Exception:
+    _HAS_PIL = False
+
+try:
+    from pillow_heif import register_heif_opener  # pip: pillow-heif
+    register_heif_opener()
+    _HAS_HEIF = True
+except Exception:
+    _HAS_HEIF = False
+
+# EXIF orientations 5-8 are stored rotated by 90 degrees, so -auto-orient swaps width/height
+_SWAPPED_ORIENTATIONS = {"LeftTop", "RightTop", "RightBottom", "LeftBottom"}
+_JPEG_EXTS = {".jpg", ".jpeg"}
+_EXIF_ORIENTATION = 0x0112
+_HEIF_EXTS = {".heic", ".heif"}
+
+
+def find_imagemagick() -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """(magick, convert, identify) binaries on PATH; IM7 has `magick`, IM6 the separate tools."""
+    return which("magick"), which("convert"), which("identify")
+
+
+def pillow_can_open(path: Path) -> bool:
+    """Whether Pillow is installed and can decode this kind of file (HEIC/HEIF needs pillow-heif)."""
+    return _HAS_PIL and (_HAS_HEIF or path.suffix.lower() not in _HEIF_EXTS)
+
+
+def fit_resize(orig_w: int, orig_h: int, box_w: int, box_h: int) -> tuple[Decimal, int, int] | None:
+    """
+    Percent and new size that cover box_w x box_h (plus 1% headroom), keeping aspect ratio.
+    Returns None when the image already fits inside the box.
+    """
+    if orig_w <= box_w and orig_h <= box_h:
+        return None
+    sw = Decimal(box_w) / Decimal(orig_w)
+    sh = Decimal(box_h) / Decimal(orig_h)
+    scale = sh if sw < sh else sw
+    scale += Decimal("0.01")
+    new_w = int((Decimal(orig_w) * scale).to_integral_value())
+    new_h = int((Decimal(orig_h) * scale).to_integral_value())
+    return scale * Decimal("100"), new_w, new_h
+
+
+class Rendered(NamedTuple):
+    orig_w: int
+    orig_h: int
+    new_w: int
+    new_h: int
+    percent: Optional[Decimal]  # None when the image fit already and was only auto-oriented
+    im_args: str
+    mode: str = "convert"       # backend that produced the file (goes to conversions.im_mode)
 
 class ImageEngine:
+    mode = "convert"
+
     def __init__(self, timeout: int, quality: int):
         self.timeout = timeout
         self.quality = quality
         self.magick, self.convert, self.identify = self._pick_im()
+        # called with (argv, wall seconds) after every ImageMagick process, e.g. by the run profiler
+        self.on_subprocess: Optional[Callable[[list[str], float], None]] = None
 
     def _pick_im(self):
-        magick = which("magick")
-        convert = which("convert")
-        identify = which("identify")
+        magick, convert, identify = find_imagemagick()
         if not (magick or (convert and identify)):
             raise SystemExit("ImageMagick not found. Need either 'magick' or 'convert'+'identify' in PATH.")
         return magick, convert, identify
 
-    def _run(self, argv: list[str]):
-        subprocess.run(argv, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                       timeout=self.timeout, text=True)
+    def _run(self, argv: list[str]) -> str:
+        t0 = time.perf_counter()
+        try:
+            cp = subprocess.run(argv, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                timeout=self.timeout, text=True)
+        finally:
+            if self.on_subprocess:
+                self.on_subprocess(argv, time.perf_counter() - t0)
+        return cp.stdout
 
     def auto_orient(self, src: Path, dst: Path):
         if self.magick:
@@ -34,8 +99,7 @@ class ImageEngine:
             argv = [self.magick, "identify", "-format", "%w %h", str(path)]
         else:
             argv = [self.identify, "-format", "%w %h", str(path)]
-        cp = subprocess.run(argv, check=True, capture_output=True, text=True, timeout=self.timeout)
-        w, h = (int(x) for x in cp.stdout.strip().split())
+        w, h = (int(x) for x in self._run(argv).strip().split())
         return w, h
 
     def resize_percent(self, src: Path, dst: Path, percent: Decimal) -> str:
@@ -47,6 +111,67 @@ class ImageEngine:
         self._run(argv)
         return f"-resize {pct_str} -quality {self.quality}"
 
+    def render(self, src: Path, dst: Path, box_w: int, box_h: int) -> Rendered:
+        """
+        Auto-orient + measure + (maybe) resize in a single decode, without a full-size temp image.
+        IM7 does it in one process: the oriented size is printed via info: and the resize percent is
+        an fx expression over that same image. IM6 has no fx escapes in -resize, so it pings the
+        header first (no pixel decode) and then runs a single convert.
+        JPEGs take the two-step route, but their size comes from app.probe (no extra process): knowing
+        it up front lets libjpeg decode at a reduced scale (-define jpeg:size) before the exact resize.
+        """
+        jpeg = src.suffix.lower() in _JPEG_EXTS
+        if self.magick and not jpeg:
+            fx = f"({box_w}<w||{box_h}<h)?(max({box_w}/w,{box_h}/h)+0.01)*100:100"
+            geometry = f"%[fx:{fx}]%%"  # evaluated by IM at full precision; recorded as-is
+            argv = [self.magick, str(src), "-auto-orient",
+                    "-format", "%w %h\\n", "-write", "info:-",
+                    "-resize", geometry, "-quality", str(self.quality), str(dst)]
+            out = self._run(argv)
+            orig_w, orig_h = (int(x) for x in out.splitlines()[0].split())
+            fit = fit_resize(orig_w, orig_h, box_w, box_h)
+            hint = ""
+        else:
+            orig_w, orig_h, swapped = self._ping(src)
+            fit = fit_resize(orig_w, orig_h, box_w, box_h)
+            argv = [self.magick] if self.magick else [self.convert]
+            hint = ""
+            if fit and jpeg:
+                # decoder scales by 1/2, 1/4 or 1/8 while staying >= the hint (given in stored orientation)
+                hw, hh = (fit[2], fit[1]) if swapped else (fit[1], fit[2])
+                hint = f"-define jpeg:size={hw}x{hh} "
+                argv += ["-define", f"jpeg:size={hw}x{hh}"]
+            argv += [str(src), "-auto-orient"]
+            if fit:
+                # the decoded image may already be smaller than the source, so resize to absolute pixels
+                geometry = f"{fit[1]}x{fit[2]}!" if jpeg else f"{fit[0]:.2f}%"
+                argv += ["-resize", geometry, "-quality", str(self.quality)]
+            self._run(argv + [str(dst)])
+
+        if not fit:
+            return Rendered(orig_w, orig_h, orig_w, orig_h, None, "-auto-orient", self.mode)
+        percent, new_w, new_h = fit
+        return Rendered(orig_w, orig_h, new_w, new_h, percent,
+                        f"{hint}-resize {geometry} -quality {self.quality}", self.mode)
+
+    def _ping(self, path: Path) -> tuple[int, int, bool]:
+        """Oriented size plus whether -auto-orient swaps the axes, read from the header only."""
+        probed = probe(path) if path.suffix.lower() in _JPEG_EXTS else None
+        if probed:
+            w, h = probed.oriented
+            return w, h, probed.orientation in (5, 6, 7, 8)
+        ident = [self.magick, "identify"] if self.magick else [self.identify]
+        out = self._run(ident + ["-ping", "-format", "%w %h %[orientation]\\n", str(path)])
+        w, h, orientation = out.splitlines()[0].split()
+        if orientation in _SWAPPED_ORIENTATIONS:
+            return int(h), int(w), True
+        return int(w), int(h), False
+
+    def oriented_size(self, path: Path) -> tuple[int, int]:
+        """Size after -auto-orient, read from the header only (-ping)."""
+        w, h, _ = self._ping(path)
+        return w, h
+
     @staticmethod
     def sha256_file(path: Path) -> str:
         h = hashlib.sha256()
@@ -54,3 +179,104 @@ class ImageEngine:
             for chunk in iter(lambda: f.read(1 << 20), b""):
                 h.update(chunk)
         return h.hexdigest()
+
+
+class PillowEngine:
+    """
+    In-process backend: Pillow (+ pillow-heif for HEIC when installed), no fork/exec per operation.
+    Same contract as ImageEngine. Any file Pillow can't read or write is handed to the
+    ImageMagick fallback for that call.
+    """
+    mode = "pillow"
+    _FORMATS = {"JPEG", "PNG", "TIFF", "HEIF"}
+
+    def __init__(self, timeout: int, quality: int, fallback: ImageEngine | None = None):
+        if not _HAS_PIL:
+            raise SystemExit("Pillow not installed. Need 'pip install Pillow' (and pillow-heif for HEIC).")
+        self.timeout = timeout
+        self.quality = quality
+        self.fallback = fallback
+
+    def _open(self, path: Path) -> "Image.Image":
+        img = Image.open(path)
+        if img.format not in self._FORMATS:
+            img.close()
+            raise ValueError(f"Pillow backend does not handle {img.format} ({path.name})")
+        return img
+
+    def _save(self, img: "Image.Image", dst: Path) -> None:
+        kwargs = {}
+        if img.info.get("exif"):
+            kwargs["exif"] = img.info["exif"]
+        if img.info.get("icc_profile"):
+            kwargs["icc_profile"] = img.info["icc_profile"]
+        if dst.suffix.lower() in {".jpg", ".jpeg"}:
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            kwargs["quality"] = self.quality
+        img.save(dst, **kwargs)
+
+    def _fallback(self, name: str, exc: Exception, *args):
+        if not self.fallback:
+            raise exc
+        return getattr(self.fallback, name)(*args)
+
+    def auto_orient(self, src: Path, dst: Path):
+        try:
+            with self._open(src) as img:
+                self._save(ImageOps.exif_transpose(img), dst)
+        except Exception as e:
+            self._fallback("auto_orient", e, src, dst)
+
+    def identify_size(self, path: Path) -> tuple[int, int]:
+        try:
+            with self._open(path) as img:
+                return img.size
+        except Exception as e:
+            return self._fallback("identify_size", e, path)
+
+    def resize_percent(self, src: Path, dst: Path, percent: Decimal) -> str:
+        try:
+            with self._open(src) as img:
+                size = tuple(int((Decimal(x) * percent / 100).to_integral_value()) for x in img.size)
+                self._save(img.resize(size, Image.LANCZOS), dst)
+        except Exception as e:
+            return self._fallback("resize_percent", e, src, dst, percent)
+        return f"-resize {percent:.2f}% -quality {self.quality}"
+
+    def render(self, src: Path, dst: Path, box_w: int, box_h: int) -> Rendered:
+        try:
+            with self._open(src) as img:
+                orig_w, orig_h = img.size
+                swapped = img.getexif().get(_EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+                if swapped:
+                    orig_w, orig_h = orig_h, orig_w
+                fit = fit_resize(orig_w, orig_h, box_w, box_h)
+                if fit and img.format == "JPEG":
+                    # shrink-on-load: DCT-domain downscale to >= the target before decoding the pixels
+                    img.draft(img.mode, (fit[2], fit[1]) if swapped else (fit[1], fit[2]))
+                img = ImageOps.exif_transpose(img)
+                if fit:
+                    img = img.resize((fit[1], fit[2]), Image.LANCZOS)
+                self._save(img, dst)
+        except Exception as e:
+            return self._fallback("render", e, src, dst, box_w, box_h)
+
+        if not fit:
+            return Rendered(orig_w, orig_h, orig_w, orig_h, None, "-auto-orient", self.mode)
+        percent, new_w, new_h = fit
+        return Rendered(orig_w, orig_h, new_w, new_h, percent,
+                        f"-resize {percent:.2f}% -quality {self.quality}", self.mode)
+
+    sha256_file = staticmethod(ImageEngine.sha256_file)
+
+
+def make_engine(kind: str, timeout: int, quality: int):
+    """Build the configured backend ("magick" or "pillow"); Pillow falls back to ImageMagick if present."""
+    if kind == "pillow":
+        try:
+            fallback = ImageEngine(timeout=timeout, quality=quality)
+        except SystemExit:
+            fallback = None
+        return PillowEngine(timeout=timeout, quality=quality, fallback=fallback)
+    return ImageEngine(timeout=timeout, quality=quality)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+import math, os, threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Prometheus text exposition format (version 0.0.4), hand-rolled so the converter needs no extra package.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; covers a cached DB lookup up to a slow HEIC render on the Pi
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # per-bucket counts, sum, count
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, value) -> list[str]:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = 'le="%s"' % _fmt(bound)
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """A set of metrics rendered together, for an HTTP /metrics endpoint or a node-exporter textfile."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, doc: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, doc, labelnames))
+
+    def gauge(self, name: str, doc: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, doc, labelnames))
+
+    def histogram(self, name: str, doc: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for m in self._metrics for line in m.render()) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """Replace `path` atomically, as node-exporter's textfile collector expects (it may read at any time)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(self.render())
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+
+class ConverterMetrics:
+    """Metrics of one converter process (a cron run, or the watch daemon across its runs)."""
+
+    def __init__(self):
+        r = self.registry = Registry()
+        self.files = r.counter("photo_resizer_files_total", "Files processed, by location and outcome",
+                               ("location", "status"))
+        self.bytes_in = r.counter("photo_resizer_source_bytes_total", "Source bytes of processed files", ("location",))
+        self.bytes_out = r.counter("photo_resizer_output_bytes_total", "Bytes written to Resized/", ("location",))
+        self.file_seconds = r.histogram("photo_resizer_file_seconds", "Wall time per file", ("status",))
+        self.stage_seconds = r.histogram("photo_resizer_stage_seconds",
+                                         "Wall time per file spent in each stage (see app/timing.py)", ("stage",))
+        self.claims_skipped = r.counter("photo_resizer_claims_skipped_total",
+                                        "Candidates skipped because another run or node holds their lease",
+                                        ("location",))
+        self.queue_depth = r.gauge("photo_resizer_queue_depth", "Files submitted to workers and not finished yet")
+        self.workers_busy = r.gauge("photo_resizer_workers_busy", "Workers currently processing a file")
+        self.workers = r.gauge("photo_resizer_workers", "Configured parallel workers")
+        self.watch_pending = r.gauge("photo_resizer_watch_pending",
+                                     "Changed files the watch daemon is waiting on to settle")
+        self.run_started = r.gauge("photo_resizer_run_start_timestamp_seconds",
+                                   "Start of the current or last run", ("location",))
+        self.run_finished = r.gauge("photo_resizer_last_run_timestamp_seconds",
+                                    "End of the last completed run", ("location",))
+        self.run_seconds = r.gauge("photo_resizer_last_run_duration_seconds",
+                                   "Wall time of the last completed run", ("location",))
+        self.run_files = r.gauge("photo_resizer_last_run_files", "Candidates handled by the last run", ("location",))
+
+
+def textfile_path(template: Optional[str], location: str) -> Optional[Path]:
+    """METRICS_TEXTFILE with {location} filled in; separate cron runs need separate files."""
+    return Path(template.format(location=location)) if template else None
@@ -1,13 +1,53 @@
 from __future__ import annotations
+import json
 import os
+import time
 from pathlib import Path
-from typing import Tuple, List
+from typing import Callable, Iterator, Optional, Tuple, List
+
+_TEMP_MARKERS = ("_auto_oriented", "_resized")
+
+
+class ScanManifest:
+    """
+    Persistent per-directory scan cache (JSON) for one watch root.
+    For every directory it keeps the directory mtime plus the names of the candidate files, temp
+    artifacts and subdirectories found at that mtime (no per-file stat: the converter stats each
+    candidate once itself, since in-place edits don't change the directory mtime). Adding, removing or
+    renaming an entry bumps the directory mtime, so an unchanged directory is not listed again;
+    its subdirectories are still stat'ed because their changes don't propagate upwards.
+    """
+    VERSION = 2  # 1 stored per-file size/mtime/inode
+    # directories modified this recently might change again within the same mtime tick
+    SETTLE_NS = 2_000_000_000
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.dirs: dict[str, dict] = {}
+        if path and path.exists():
+            try:
+                data = json.loads(path.read_text())
+                if data.get("version") == self.VERSION:
+                    self.dirs = data["dirs"]
+            except (OSError, ValueError, KeyError):
+                self.dirs = {}
+
+    def save(self, dirs: dict[str, dict]) -> None:
+        self.dirs = dirs
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": self.VERSION, "dirs": dirs}))
+        os.replace(tmp, self.path)
+
 
 class Planner:
-    def __init__(self, base: Path, locations: dict[str, str], exts: set[str]):
+    def __init__(self, base: Path, locations: dict[str, str], exts: set[str], manifest_dir: Optional[Path] = None):
         self.base = base
         self.locations = locations
         self.exts = exts
+        self.manifest_dir = manifest_dir
 
     def dirs_for_location(self, key: str) -> tuple[Path, Path]:
         loc_cap = self.locations[key]
@@ -16,18 +56,73 @@ class Planner:
         out.mkdir(parents=True, exist_ok=True)
         return watch, out
 
+    def is_candidate(self, path: Path) -> bool:
+        # skip our temp artifacts outright
+        if any(m in path.name for m in _TEMP_MARKERS):
+            return False
+        return path.suffix.lower() in self.exts
+
+    def location_for(self, path: Path) -> Optional[str]:
+        """Location key whose Original/ tree contains `path`, if any."""
+        for key, folder in self.locations.items():
+            if path.is_relative_to(self.base / folder / "Original"):
+                return key
+        return None
+
     def list_candidates(self, root: Path) -> list[Path]:
-        out: list[Path] = []
-        for r, dirs, files in os.walk(root):
-            dirs[:] = [d for d in dirs if not d.startswith(".")]
-            for fn in files:
-                # skip our temp artifacts outright
-                if "_auto_oriented" in fn or "_resized" in fn:
-                    continue
-                p = Path(r) / fn
-                if p.suffix.lower() in self.exts:
-                    out.append(p)
-        return sorted(out)
+        return sorted(self.iter_candidates(root))
+
+    def _manifest_for(self, root: Path) -> ScanManifest:
+        if not self.manifest_dir:
+            return ScanManifest(None)
+        return ScanManifest(self.manifest_dir / f"scan-{root.parent.name}-{root.name}.json")
+
+    def _list_dir(self, d: Path, mtime_ns: int) -> dict:
+        files: list[str] = []
+        temps: list[str] = []
+        subdirs: list[str] = []
+        with os.scandir(d) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if not e.name.startswith("."):
+                        subdirs.append(e.name)
+                elif any(m in e.name for m in _TEMP_MARKERS):
+                    temps.append(e.name)  # our own artifacts; never candidates
+                elif self.is_candidate(Path(e.name)):
+                    files.append(e.name)
+        # too fresh to trust: store an impossible mtime so the next scan lists it again
+        settled = time.time_ns() - mtime_ns > ScanManifest.SETTLE_NS
+        return {"mtime_ns": mtime_ns if settled else -1,
+                "files": sorted(files), "temps": sorted(temps), "subdirs": sorted(subdirs)}
+
+    def iter_candidates(self, root: Path,
+                        on_temp: Optional[Callable[[Path], None]] = None) -> Iterator[Path]:
+        """
+        Stream candidate files as directories are scanned (sorted within each directory), so work
+        can start before the walk finishes. Directories unchanged since the last scan are served
+        from the manifest. Temp artifacts are reported through on_temp instead of being yielded.
+        The manifest is saved once the walk completes.
+        """
+        manifest = self._manifest_for(root)
+        seen: dict[str, dict] = {}
+        stack = [root]
+        while stack:
+            d = stack.pop()
+            try:
+                mtime_ns = os.stat(d).st_mtime_ns
+                entry = manifest.dirs.get(str(d))
+                if not entry or entry["mtime_ns"] != mtime_ns:
+                    entry = self._list_dir(d, mtime_ns)
+            except OSError:
+                continue
+            seen[str(d)] = entry
+            if on_temp:
+                for fn in entry["temps"]:
+                    on_temp(d / fn)
+            for fn in sorted(entry["files"]):
+                yield d / fn
+            stack.extend(d / sub for sub in reversed(entry["subdirs"]))
+        manifest.save(seen)
 
     @staticmethod
     def mapped_ext(original_ext: str) -> str:
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import io, os, struct
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional
+
+# Header-only probing: read width/height and EXIF orientation from JPEG/PNG/TIFF/HEIC headers
+# without decoding any pixels. Anything unexpected returns None and callers fall back to the engine.
+
+_EXIF_ORIENTATION = 0x0112
+_TIFF_WIDTH, _TIFF_HEIGHT = 0x0100, 0x0101
+# SOF0-3, 5-7, 9-11, 13-15 carry the frame size; DHT/JPG/DAC share the 0xC4/C8/CC slots
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_PNG_SIG = b"\x89PNG\r\n\x1a\n"
+_HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"}
+# irot angle (counter-clockwise quarter turns) -> equivalent EXIF orientation
+_IROT_ORIENTATION = {0: 1, 1: 8, 2: 3, 3: 6}
+
+
+class Probe(NamedTuple):
+    width: int        # as stored, before orientation is applied
+    height: int
+    orientation: int  # EXIF 1-8; 1 when absent
+
+    @property
+    def oriented(self) -> tuple[int, int]:
+        """Size after auto-orient (orientations 5-8 swap the axes)."""
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+
+def probe(path: Path) -> Optional[Probe]:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(16)
+            if head[:2] == b"\xff\xd8":
+                return _jpeg(f)
+            if head[:8] == _PNG_SIG:
+                return _png(f)
+            if head[:4] in (b"II*\x00", b"MM\x00*"):
+                return _tiff(f)
+            if head[4:8] == b"ftyp" and head[8:12] in _HEIF_BRANDS:
+                return _heif(f)
+    except (OSError, struct.error, ValueError):
+        pass
+    return None
+
+
+def _ifd0(f: BinaryIO, base: int, tags: set[int]) -> dict[int, int]:
+    """Single-valued SHORT/LONG tags from the first IFD of a TIFF structure starting at `base`."""
+    f.seek(base)
+    head = f.read(8)
+    if head[:2] == b"II":
+        e = "<"
+    elif head[:2] == b"MM":
+        e = ">"
+    else:
+        return {}
+    if len(head) < 8 or struct.unpack(e + "H", head[2:4])[0] != 42:
+        return {}
+    f.seek(base + struct.unpack(e + "I", head[4:8])[0])
+    (count,) = struct.unpack(e + "H", f.read(2))
+    entries = f.read(12 * min(count, 1024))
+    out: dict[int, int] = {}
+    for i in range(len(entries) // 12):
+        tag, typ, n = struct.unpack(e + "HHI", entries[i * 12:i * 12 + 8])
+        if tag not in tags or n != 1:
+            continue
+        if typ == 3:
+            out[tag] = struct.unpack(e + "H", entries[i * 12 + 8:i * 12 + 10])[0]
+        elif typ == 4:
+            out[tag] = struct.unpack(e + "I", entries[i * 12 + 8:i * 12 + 12])[0]
+    return out
+
+
+def _exif_orientation(data: bytes) -> int:
+    orientation = _ifd0(io.BytesIO(data), 0, {_EXIF_ORIENTATION}).get(_EXIF_ORIENTATION, 1)
+    return orientation if 1 <= orientation <= 8 else 1
+
+
+def _jpeg(f: BinaryIO) -> Optional[Probe]:
+    f.seek(2)
+    orientation = 1
+    while True:
+        b = f.read(1)
+        while b and b != b"\xff":
+            b = f.read(1)
+        while b == b"\xff":
+            b = f.read(1)
+        if not b:
+            return None
+        marker = b[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue  # standalone markers carry no length
+        if marker in (0xD9, 0xDA):
+            return None  # EOI/SOS before any frame header
+        (seglen,) = struct.unpack(">H", f.read(2))
+        if seglen < 2:
+            return None
+        if marker in _JPEG_SOF:
+            _, h, w = struct.unpack(">BHH", f.read(5))
+            return Probe(w, h, orientation)
+        if marker == 0xE1:
+            data = f.read(seglen - 2)
+            if data[:6] == b"Exif\x00\x00":
+                orientation = _exif_orientation(data[6:])
+            continue
+        f.seek(seglen - 2, os.SEEK_CUR)
+
+
+def _png(f: BinaryIO) -> Optional[Probe]:
+    f.seek(8)
+    size = None
+    orientation = 1
+    while True:
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            break
+        length, ctype = struct.unpack(">I4s", hdr)
+        if ctype == b"IHDR":
+            size = struct.unpack(">II", f.read(8))
+            f.seek(length - 8 + 4, os.SEEK_CUR)
+        elif ctype == b"eXIf":
+            orientation = _exif_orientation(f.read(length))
+            f.seek(4, os.SEEK_CUR)
+        elif ctype in (b"IDAT", b"IEND"):
+            break  # eXIf must precede the image data
+        else:
+            f.seek(length + 4, os.SEEK_CUR)
+    if not size:
+        return None
+    return Probe(size[0], size[1], orientation)
+
+
+def _tiff(f: BinaryIO) -> Optional[Probe]:
+    tags = _ifd0(f, 0, {_TIFF_WIDTH, _TIFF_HEIGHT, _EXIF_ORIENTATION})
+    if _TIFF_WIDTH not in tags or _TIFF_HEIGHT not in tags:
+        return None
+    orientation = tags.get(_EXIF_ORIENTATION, 1)
+    return Probe(tags[_TIFF_WIDTH], tags[_TIFF_HEIGHT], orientation if 1 <= orientation <= 8 else 1)
+
+
+def _boxes(f: BinaryIO, start: int, end: int):
+    """Yield (type, payload_start, payload_end) for ISOBMFF boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, btype = struct.unpack(">I4s", f.read(8))
+        hdr = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", f.read(8))
+            hdr = 16
+        elif size == 0:
+            size = end - pos
+        if size < hdr:
+            return
+        yield btype, pos + hdr, min(pos + size, end)
+        pos += size
+
+
+def _heif(f: BinaryIO) -> Optional[Probe]:
+    """Primary item's ispe (size) and irot (rotation) from the meta box."""
+    end = os.fstat(f.fileno()).st_size
+    meta = next(((s, e) for t, s, e in _boxes(f, 0, end) if t == b"meta"), None)
+    if not meta:
+        return None
+
+    primary = None
+    props: list[tuple[bytes, int, int]] = []
+    assoc: dict[int, list[int]] = {}
+    for btype, s, e in _boxes(f, meta[0] + 4, meta[1]):  # meta is a FullBox
+        if btype == b"pitm":
+            f.seek(s)
+            version = f.read(4)[0]
+            primary = struct.unpack(">I" if version else ">H", f.read(4 if version else 2))[0]
+        elif btype == b"iprp":
+            for ptype, ps, pe in _boxes(f, s, e):
+                if ptype == b"ipco":
+                    props = list(_boxes(f, ps, pe))
+                elif ptype == b"ipma":
+                    assoc.update(_ipma(f, ps))
+    if primary is None:
+        return None
+
+    size = None
+    orientation = 1
+    for index in assoc.get(primary, []):
+        if not 1 <= index <= len(props):
+            continue
+        ptype, ps, _ = props[index - 1]
+        f.seek(ps)
+        if ptype == b"ispe":
+            size = struct.unpack(">II", f.read(12)[4:])
+        elif ptype == b"irot":
+            orientation = _IROT_ORIENTATION[f.read(1)[0] & 0x3]
+    if not size:
+        return None
+    return Probe(size[0], size[1], orientation)
+
+
+def _ipma(f: BinaryIO, start: int) -> dict[int, list[int]]:
+    f.seek(start)
+    version, flags = f.read(1)[0], int.from_bytes(f.read(3), "big")
+    (count,) = struct.unpack(">I", f.read(4))
+    out: dict[int, list[int]] = {}
+    for _ in range(min(count, 65536)):
+        item_id = struct.unpack(">I" if version else ">H", f.read(4 if version else 2))[0]
+        n = f.read(1)[0]
+        if flags & 1:
+            out[item_id] = [struct.unpack(">H", f.read(2))[0] & 0x7FFF for _ in range(n)]
+        else:
+            out[item_id] = [f.read(1)[0] & 0x7F for _ in range(n)]
+    return out
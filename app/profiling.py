@@ -0,0 +1,179 @@
+from __future__ import annotations
+import cProfile, heapq, io, os, pstats, re, sys, threading, time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Optional
+
+from app.timing import STAGES
+
+
+def report_dir_for(root: Path, label: str) -> Path:
+    """Fresh per-run directory under root, e.g. <root>/20250101-031500-home."""
+    return root / f"{time.strftime('%Y%m%d-%H%M%S')}-{label}"
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _argv_shape(argv: list[str]) -> str:
+    """argv with file arguments replaced, so calls can be grouped: 'magick <file> -auto-orient ...'."""
+    parts = [os.path.basename(argv[0])] if argv else []
+    for a in argv[1:]:
+        parts.append("<file>" if os.sep in a and not a.startswith("-") else a)
+    return " ".join(parts)
+
+
+class _Sampler(threading.Thread):
+    """Stack sampler over all threads (stdlib only), aggregated into collapsed stacks for flamegraph tools."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            names = {t.ident: re.sub(r"_\d+$", "", t.name) for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class RunProfiler:
+    """
+    Profiles a conversion run and writes a report directory:
+      profile.pstats     cProfile of the run (snakeviz, `python -m pstats`)
+      stacks.collapsed   sampled stacks of all threads ("a;b;c count"; flamegraph.pl, speedscope)
+      subprocess.tsv     wall time of every ImageMagick process with its argv
+      report.txt         top functions, ImageMagick calls grouped by argv shape, slowest files by stage
+    cProfile sees the main thread and the threads started during the run (conversion workers);
+    threads that already existed (hash prefetch) only show up in the sampled stacks.
+    """
+
+    def __init__(self, report_dir: Path, *, top_n: int = 20, interval: float = 0.005, log=None):
+        self.report_dir = report_dir
+        self.top_n = top_n
+        self.interval = interval
+        self.log = log
+        self._lock = threading.Lock()
+        self._profile = cProfile.Profile()
+        self._thread_profiles: list[cProfile.Profile] = []
+        self._sampler: Optional[_Sampler] = None
+        self._subprocesses: list[tuple[float, list[str]]] = []
+        self._slowest: list[tuple[int, int, str, str, dict]] = []  # min-heap of (duration_ms, seq, ...)
+        self._seq = 0
+        self._files = 0
+        self._hooked: list = []
+
+    def attach(self, converter) -> None:
+        """Hook the converter's per-file callback and its engines' subprocess callback."""
+        converter.on_file = self._on_file
+        self._hooked.append((converter, "on_file"))
+        for engine in (converter.engine, getattr(converter.engine, "fallback", None)):
+            if engine is not None and hasattr(engine, "on_subprocess"):
+                engine.on_subprocess = self._on_subprocess
+                self._hooked.append((engine, "on_subprocess"))
+
+    def _on_file(self, path: Path, status: str, duration_ms: int, stages: dict) -> None:
+        with self._lock:
+            self._files += 1
+            self._seq += 1
+            entry = (duration_ms, self._seq, str(path), status, stages)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            elif duration_ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _on_subprocess(self, argv: list[str], secs: float) -> None:
+        with self._lock:
+            self._subprocesses.append((secs, list(argv)))
+
+    def _start_thread_profile(self, frame, event, arg) -> None:
+        # installed through threading.setprofile: runs once in each new thread and hands over to cProfile
+        sys.setprofile(None)
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            return  # Python 3.12+: one profiler per interpreter, which already covers this thread
+        with self._lock:
+            self._thread_profiles.append(prof)
+
+    def __enter__(self) -> "RunProfiler":
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        self._started = time.perf_counter()
+        self._sampler = _Sampler(self.interval)
+        self._sampler.start()
+        threading.setprofile(self._start_thread_profile)
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        threading.setprofile(None)
+        self._sampler.stop()
+        wall = time.perf_counter() - self._started
+        for obj, attr in self._hooked:
+            setattr(obj, attr, None)
+
+        stats = pstats.Stats(self._profile)
+        for prof in self._thread_profiles:
+            prof.create_stats()  # the run's worker threads have exited by now
+            stats.add(prof)
+        stats.dump_stats(self.report_dir / "profile.pstats")
+        self._write_stacks()
+        self._write_subprocesses()
+        self._write_report(stats, wall)
+        if self.log:
+            self.log.info("Profile report written to %s", self.report_dir)
+
+    def _write_stacks(self) -> None:
+        with open(self.report_dir / "stacks.collapsed", "w") as f:
+            for stack, count in sorted(self._sampler.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+    def _write_subprocesses(self) -> None:
+        with open(self.report_dir / "subprocess.tsv", "w") as f:
+            f.write("seconds\targv\n")
+            for secs, argv in self._subprocesses:
+                f.write(f"{secs:.4f}\t{' '.join(argv)}\n")
+
+    def _write_report(self, stats: pstats.Stats, wall: float) -> None:
+        out = io.StringIO()
+        out.write(f"Wall time: {wall:.2f}s, files: {self._files}, "
+                  f"stack samples: {self._sampler.samples} every {self.interval * 1000:g}ms\n\n")
+
+        out.write(f"== Slowest {len(self._slowest)} files (ms) ==\n")
+        out.write(f"{'total':>8} " + " ".join(f"{s:>7}" for s in STAGES) + "  status        file\n")
+        for duration_ms, _, path, status, stages in sorted(self._slowest, reverse=True):
+            cols = " ".join(f"{'-' if stages.get(f'{s}_ms') is None else stages[f'{s}_ms']:>7}" for s in STAGES)
+            out.write(f"{duration_ms:>8} {cols}  {status:<13} {path}\n")
+
+        groups: dict[str, list[float]] = defaultdict(list)
+        for secs, argv in self._subprocesses:
+            groups[_argv_shape(argv)].append(secs)
+        out.write(f"\n== ImageMagick processes: {len(self._subprocesses)}, "
+                  f"{sum(s for s, _ in self._subprocesses):.2f}s total ==\n")
+        out.write(f"{'calls':>6} {'total s':>9} {'mean s':>8} {'max s':>8}  argv\n")
+        for shape, times in sorted(groups.items(), key=lambda kv: -sum(kv[1]))[:self.top_n]:
+            out.write(f"{len(times):>6} {sum(times):>9.2f} {sum(times) / len(times):>8.3f} {max(times):>8.3f}  {shape}\n")
+
+        out.write("\n== Top functions by cumulative time ==\n")
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(30)
+        (self.report_dir / "report.txt").write_text(out.getvalue())
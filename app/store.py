@@ -0,0 +1,101 @@
+from __future__ import annotations
+import hashlib, os, shutil
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+    _HAS_FCNTL = True
+except Exception:
+    _HAS_FCNTL = False
+
+_FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def render_key(*settings) -> str:
+    """Short digest of the settings that shape an output (box size, quality, ...)."""
+    return hashlib.blake2b(repr(settings).encode(), digest_size=6).hexdigest()
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if not _HAS_FCNTL:
+        raise OSError("reflink needs fcntl")
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+    except OSError:
+        dst.unlink(missing_ok=True)
+        raise
+
+
+def materialize(src: Path, dst: Path) -> str:
+    """Place src's bytes at dst as cheaply as the filesystem allows: hardlink, reflink, then a copy."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass  # cross-device, or no hardlinks (SMB/FAT)
+    try:
+        _reflink(src, dst)
+        return "reflink"
+    except OSError:
+        pass  # not btrfs/xfs/... or different filesystems
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+class OutputStore:
+    """
+    Content-addressed resized outputs: <root>/<ab>/<src_hash>-<render_key><ext>. Each Resized/ file
+    is a hardlink to its store entry, so a dedupe hit in another location costs one link instead of
+    a data copy. Entries only exist where hardlinks work; elsewhere outputs are plain files and
+    dedupe hits fall back to reflink/copy from the existing output.
+    Outputs are always replaced (unlink + new file), never rewritten in place, so linked copies
+    cannot change under each other.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path_for(self, src_hash: str, key: str, ext: str) -> Path:
+        name = src_hash.replace(":", "-")  # "algo:hex" for non-SHA256 hashes
+        return self.root / name[-2:] / f"{name}-{key}{ext.lower()}"
+
+    def lookup(self, src_hash: str, key: str, ext: str) -> Optional[Path]:
+        p = self.path_for(src_hash, key, ext)
+        return p if p.exists() else None
+
+    def adopt(self, output: Path, src_hash: str, key: str, ext: str) -> bool:
+        """Register a freshly written output as the store entry for (src_hash, key)."""
+        entry = self.path_for(src_hash, key, ext)
+        if entry.exists():
+            return False
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            os.link(output, entry)
+            return True
+        except FileExistsError:
+            return False  # another worker adopted the same content first
+        except OSError:
+            return False  # store on another filesystem, or no hardlinks
+
+    def prune(self) -> int:
+        """Remove entries no Resized/ file links to any more (link count 1). Returns the number removed."""
+        removed = 0
+        if not self.root.is_dir():
+            return 0
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                try:
+                    if entry.stat().st_nlink <= 1:
+                        entry.unlink()
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -0,0 +1,28 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Per-file processing stages, in pipeline order; each is stored as a <stage>_ms column.
+# "db" is the file's lookups only: its own row is written in batches (after the row is built), so the
+# write time is a run-level figure, logged as "db_write" with the stage totals.
+STAGES = ("hash", "db", "probe", "render", "place")
+
+
+class StageTimer:
+    """Wall time spent in each stage while processing one file (a stage may be entered several times)."""
+
+    def __init__(self):
+        self.ms: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.ms[name] = self.ms.get(name, 0.0) + (time.perf_counter() - t0) * 1000
+
+    def columns(self) -> dict[str, int | None]:
+        """{"hash_ms": 12, ...}; stages the file never reached are None."""
+        return {f"{s}_ms": int(round(self.ms[s])) if s in self.ms else None for s in STAGES}
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import ctypes, ctypes.util
+import os, select, struct, time
+from pathlib import Path
+from typing import Iterable
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows, NUL-padded)
+
+
+def _walk_dirs(root: Path) -> Iterable[Path]:
+    for r, dirs, _ in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        yield Path(r)
+
+
+class InotifyWatcher:
+    """
+    Linux inotify via ctypes (no extra dependency), one watch per directory under each root.
+    New subdirectories are watched as they appear. poll() returns paths that were created,
+    written or moved in; a queue overflow sets `overflowed` so the caller can reconcile.
+    Note: on NFS/SMB mounts only changes made from this host generate events.
+    """
+    MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+
+    def __init__(self, roots: Iterable[Path]):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._dirs: dict[int, Path] = {}
+        self.overflowed = False
+        for root in roots:
+            self._watch_tree(root)
+
+    def _watch_tree(self, root: Path) -> list[Path]:
+        """Watch root and everything below it; return files already present (moved-in trees)."""
+        found: list[Path] = []
+        for d in _walk_dirs(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(d)), self.MASK)
+            if wd >= 0:
+                self._dirs[wd] = d
+            found.extend(p for p in d.iterdir() if p.is_file())
+        return found
+
+    def poll(self, timeout: float) -> list[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changed: list[Path] = []
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / os.fsdecode(name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO) and not path.name.startswith("."):
+                    changed.extend(self._watch_tree(path))
+            else:
+                changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Fallback for hosts/mounts without inotify: diff the candidate set every `interval` seconds."""
+
+    def __init__(self, planner, roots: Iterable[Path], interval: float):
+        self.planner = planner
+        self.roots = list(roots)
+        self.interval = interval
+        self.overflowed = False
+        self._known = self._snapshot()
+        self._next = time.monotonic() + interval
+
+    def _snapshot(self) -> set[Path]:
+        return {p for root in self.roots for p in self.planner.iter_candidates(root)}
+
+    def poll(self, timeout: float) -> list[Path]:
+        wait = self._next - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() < self._next:
+                return []
+        self._next = time.monotonic() + self.interval
+        current = self._snapshot()
+        added = current - self._known
+        self._known = current
+        return sorted(added)
+
+    def close(self) -> None:
+        pass
+
+
+class Debouncer:
+    """Hold changed paths until their size and mtime have been stable for `settle` seconds."""
+
+    def __init__(self, settle: float):
+        self.settle = settle
+        self._pending: dict[Path, tuple[int, int, float]] = {}
+
+    def touch(self, path: Path) -> None:
+        self._pending[path] = (-1, -1, time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def ready(self) -> list[Path]:
+        now = time.monotonic()
+        out: list[Path] = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.settle:
+                out.append(path)
+                del self._pending[path]
+        return sorted(out)
+
+
+class WatchDaemon:
+    """
+    Long-running replacement for the cron loop: one reconciliation run per location at start,
+    then only debounced changed files go through Converter.process_paths. A full
+    Converter.run per location repeats every `reconcile_secs` (and after an inotify overflow)
+    to catch anything the events missed.
+    """
+
+    def __init__(self, converter, planner, location_keys: list[str], make_logger, *,
+                 settle_secs: float, reconcile_secs: float, poll_secs: float, force_poll: bool = False):
+        self.converter = converter
+        self.planner = planner
+        self.location_keys = location_keys
+        self.settle_secs = settle_secs
+        self.reconcile_secs = reconcile_secs
+        self.poll_secs = poll_secs
+        self.force_poll = force_poll
+        self.log = make_logger("watch")
+
+    def _make_watcher(self, roots: list[Path]):
+        if not self.force_poll:
+            try:
+                return InotifyWatcher(roots)
+            except (OSError, AttributeError) as e:
+                self.log.warning("inotify unavailable (%s); polling every %ss", e, self.poll_secs)
+        return PollingWatcher(self.planner, roots, self.poll_secs)
+
+    def _reconcile(self) -> None:
+        self.converter.run_all(self.location_keys)
+
+    def run_forever(self) -> None:
+        roots = {self.planner.dirs_for_location(key)[0]: key for key in self.location_keys}
+        self.log.info("Watching %s", ", ".join(str(r) for r in roots))
+        watcher = self._make_watcher(list(roots))
+        debouncer = Debouncer(self.settle_secs)
+        try:
+            self._reconcile()
+            next_reconcile = time.monotonic() + self.reconcile_secs
+            while True:
+                for path in watcher.poll(timeout=1.0):
+                    if self.planner.is_candidate(path):
+                        debouncer.touch(path)
+                self.converter.metrics.watch_pending.set(len(debouncer))
+                self.converter.export_metrics()
+
+                ready = debouncer.ready()
+                if ready:
+                    by_location: dict[str, list[Path]] = {}
+                    for path in ready:
+                        key = self.planner.location_for(path)
+                        if key in self.location_keys:
+                            by_location.setdefault(key, []).append(path)
+                    for key, paths in by_location.items():
+                        self.log.info("%d changed file(s) settled in '%s'", len(paths), key)
+                        try:
+                            self.converter.process_paths(key, paths)
+                        except Exception:
+                            # keep the service up; the next reconciliation picks these files up again
+                            self.log.exception("Processing %d changed file(s) in '%s' failed", len(paths), key)
+
+                if watcher.overflowed or time.monotonic() >= next_reconcile:
+                    if watcher.overflowed:
+                        self.log.warning("inotify queue overflowed; running a full reconciliation")
+                        watcher.overflowed = False
+                    try:
+                        self._reconcile()
+                    except Exception:
+                        self.log.exception("Reconciliation run failed; retrying in %ss", self.reconcile_secs)
+                    next_reconcile = time.monotonic() + self.reconcile_secs
+        finally:
+            watcher.close()
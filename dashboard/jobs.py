@@ -0,0 +1,163 @@
+from __future__ import annotations
+import contextlib, itertools, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.database_operations import LeaseKeeper, SerializedDB
+
+
+class Job:
+    """Progress of one enqueued request; state goes queued -> running -> done."""
+
+    def __init__(self, job_id: int, kind: str, paths: List[str]):
+        self.id = job_id
+        self.kind = kind  # "retry" | "retry_failed"
+        self.paths = paths
+        self.state = "queued"
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0  # leased by a cron run or another node; try again later
+        self.errors: List[str] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed + self.skipped
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "total": len(self.paths),
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "errors": self.errors[-10:],
+            "created_at": int(self.created_at),
+            "started_at": int(self.started_at) if self.started_at else None,
+            "finished_at": int(self.finished_at) if self.finished_at else None,
+        }
+
+
+class JobQueue:
+    """
+    Conversions requested from the dashboard, run off the event loop. Files go to a small thread pool
+    that shares one Converter (engine, planner, logger built once by `make_converter`) and one
+    SerializedDB writer, both created on first use. Finished jobs are kept (up to `keep`) for polling.
+    Each file is leased like a converter run's (see Converter.claim): files a run or another node is on
+    are skipped, and a LeaseKeeper heartbeats this process's leases until close().
+    """
+
+    def __init__(self, make_converter: Callable[[], Any], db_path: Path, workers: int = 2, keep: int = 50):
+        self.make_converter = make_converter
+        self.db_path = db_path
+        self.workers = workers
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, Job] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._converter = None
+        self._db: Optional[SerializedDB] = None
+        self._leases: contextlib.AbstractContextManager = contextlib.nullcontext()
+        self._inflight: set = set()  # paths being retried; a second request for one is skipped
+
+    def _start(self) -> None:
+        # caller holds self._lock
+        if self._pool is None:
+            self._converter = self.make_converter()
+            self._db = SerializedDB(self.db_path)
+            self._db.open()
+            if self._converter.claim_ttl:
+                self._leases = LeaseKeeper(self.db_path, self._converter.owner, self._converter.claim_ttl,
+                                           log=self._converter.log)
+            self._leases.__enter__()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dashboard-job")
+
+    def submit(self, kind: str, paths: List[str]) -> Job:
+        with self._lock:
+            self._start()
+            job = Job(next(self._ids), kind, list(paths))
+            self._jobs[job.id] = job
+            for old in sorted(self._jobs)[:-self.keep]:
+                if self._jobs[old].state == "done":
+                    del self._jobs[old]
+        if not job.paths:
+            job.state, job.finished_at = "done", time.time()
+        for path in job.paths:
+            self._pool.submit(self._run_one, job, path)
+        return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def recent(self) -> List[Job]:
+        return sorted(self._jobs.values(), key=lambda j: j.id, reverse=True)
+
+    def _run_one(self, job: Job, path: str) -> None:
+        full_path = Path(path)
+        with self._lock:
+            if job.state == "queued":
+                job.state, job.started_at = "running", time.time()
+            mine = path not in self._inflight
+            self._inflight.add(path)
+        ok, skipped = False, not mine
+        try:
+            if skipped:
+                return
+            converter = self._converter
+            location_key = converter.planner.location_for(full_path)
+            if not location_key:
+                raise ValueError(f"Could not determine location from path: {path}")
+            if not full_path.exists():
+                raise FileNotFoundError(f"File not found: {path}")
+            watch_dir, out_dir = converter.planner.dirs_for_location(location_key)
+            if not converter.claim(self._db, full_path):
+                skipped = True
+                return
+            before = self._db.latest_row(path)
+            converter.process_one(db=self._db, idx=job.processed + 1, total=len(job.paths),
+                                  full_path=full_path, watch_dir=watch_dir, out_dir=out_dir)
+            after = self._db.latest_row(path)
+            # no new row means ALREADY_DONE (only last_checked_at was touched)
+            ok = after == before or after[1] != "FAILED"
+            if not ok:
+                raise RuntimeError(f"{full_path.name}: conversion failed again")
+        except Exception as e:
+            with self._lock:
+                job.errors.append(str(e))
+        finally:
+            if mine:
+                try:
+                    self._converter.release(self._db, full_path)  # the row is committed (no batching here)
+                except Exception as e:
+                    with self._lock:
+                        job.errors.append(f"{full_path.name}: could not release lease: {e}")
+            with self._lock:
+                if mine:
+                    self._inflight.discard(path)
+                if skipped:
+                    job.skipped += 1
+                    job.errors.append(f"{full_path.name}: being converted elsewhere; skipped")
+                elif ok:
+                    job.succeeded += 1
+                else:
+                    job.failed += 1
+                if job.processed == len(job.paths):
+                    job.state, job.finished_at = "done", time.time()
+
+    def close(self) -> None:
+        with self._lock:
+            pool, db, leases = self._pool, self._db, self._leases
+            self._pool = self._db = None
+            self._leases = contextlib.nullcontext()
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if db:
+            db.close()
+        leases.__exit__(None, None, None)  # releases anything left, after the DB is closed
@@ -12,14 +12,26 @@ from app.database_operations import PhotoDB
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 import sqlite3
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from email.utils import formatdate, parsedate_to_datetime
+from contextvars import ContextVar
+from starlette.routing import Match
+import asyncio
+import json
 import mimetypes
+import time
 
-from app.config import DB_PATH, LOCATIONS, BASE, EXTS
+from app.config import DB_PATH, LOCATIONS, BASE, EXTS, THUMB_CACHE_DIR, THUMB_CACHE_MAX_MB
 from app.database_operations import PhotoDB
+from app.timing import STAGES
+from app.metrics import Registry, CONTENT_TYPE
+from dashboard.thumbs import ThumbCache, THUMB_FORMATS
+from dashboard.readpool import ReadPool, VersionedCache
+from dashboard.jobs import JobQueue
 
 app = FastAPI(title="Photo Resizer Dashboard", docs_url=None, redoc_url=None)
 
@@ -28,6 +40,49 @@ BASE_DIR = Path(__file__).resolve().parent
 TEMPLATES_DIR = BASE_DIR / "templates"
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
+thumbs = ThumbCache(THUMB_CACHE_DIR, THUMB_CACHE_MAX_MB * 1024 * 1024)
+
+# Prometheus metrics served at /metrics: latency per endpoint, and how long each endpoint held a DB connection
+metrics = Registry()
+request_seconds = metrics.histogram("photo_resizer_dashboard_request_seconds",
+                                    "Time until the response starts, per endpoint", ("endpoint", "method"))
+requests_total = metrics.counter("photo_resizer_dashboard_requests_total",
+                                 "Requests per endpoint and status code", ("endpoint", "method", "status"))
+sql_seconds = metrics.histogram("photo_resizer_dashboard_sql_seconds",
+                                "Time a pooled DB connection was held (SQL time), per endpoint", ("endpoint",))
+_endpoint: ContextVar[str] = ContextVar("endpoint", default="other")
+
+# Shared read-only connections; /api/data responses are reused until the converter commits again
+db_pool = ReadPool(DB_PATH, on_release=lambda secs: sql_seconds.observe(secs, endpoint=_endpoint.get()))
+response_cache = VersionedCache(db_pool)
+
+def _route_of(scope) -> str:
+    """Route template ("/api/jobs/{job_id}") so labels stay few; "other" for 404s."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "other"
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    endpoint = _route_of(request.scope)
+    token = _endpoint.set(endpoint)  # read by the pool callback, also from threadpool endpoints
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        _endpoint.reset(token)
+        request_seconds.observe(time.perf_counter() - t0, endpoint=endpoint, method=request.method)
+        requests_total.inc(endpoint=endpoint, method=request.method, status=status)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 def get_locations_config() -> Dict[str, str]:
     """Return available locations from config."""
     return LOCATIONS
@@ -42,32 +97,30 @@ def get_stats(location: Optional[str] = None) -> Dict[str, Any]:
         "last_run": "Never"
     }
     
-    with PhotoDB(DB_PATH, read_only=True) as db:
-        if not db.conn:
+    with db_pool.connection() as conn:
+        if not conn:
             return stats
         
-        # Base query parts
+        # Totals come from the stats_rollup table PhotoDB maintains on every write
         where_clauses = ["status='SUCCESS'"]
         params = []
         
         if location and location in LOCATIONS:
-            # Filter by path containing the folder name
-            folder_name = LOCATIONS[location]
-            where_clauses.append("src_fullpath LIKE ?")
-            params.append(f"%/{folder_name}/%")
+            where_clauses.append("location = ?")
+            params.append(location)
 
         where_sql = " AND ".join(where_clauses)
         
         # 1. Counts and Size Savings
         query = f"""
-            SELECT COUNT(*), SUM(saved_mb), SUM(src_size), SUM(out_size_bytes) 
-            FROM conversions 
+            SELECT SUM(files), SUM(saved_mb), SUM(src_bytes), SUM(out_bytes) 
+            FROM stats_rollup 
             WHERE {where_sql}
         """
-        cur = db.conn.execute(query, params)
+        cur = conn.execute(query, params)
         row = cur.fetchone()
         
-        if row:
+        if row and row[0]:
             stats["total_files"] = row[0]
             stats["total_saved_mb"] = round(row[1], 2) if row[1] else 0.0
             total_src = row[2] or 0
@@ -87,120 +140,169 @@ def get_stats(location: Optional[str] = None) -> Dict[str, Any]:
         rate_where = ["1=1"]
         rate_params = []
         if location and location in LOCATIONS:
-            folder_name = LOCATIONS[location]
-            rate_where.append("src_fullpath LIKE ?")
-            rate_params.append(f"%/{folder_name}/%")
+            rate_where.append("location = ?")
+            rate_params.append(location)
             
         rate_sql = " AND ".join(rate_where)
         
         query_rate = f"SELECT status FROM conversions WHERE {rate_sql} ORDER BY converted_at DESC LIMIT 100"
-        cur = db.conn.execute(query_rate, rate_params)
+        cur = conn.execute(query_rate, rate_params)
         rows = cur.fetchall()
         if rows:
             successes = sum(1 for r in rows if r[0] == 'SUCCESS')
             stats["success_rate"] = round((successes / len(rows)) * 100, 1)
 
         # 3. Last Run
-        query_last = f"SELECT converted_at FROM conversions WHERE {rate_sql} ORDER BY converted_at DESC LIMIT 1"
-        cur = db.conn.execute(query_last, rate_params)
+        last_where = "WHERE location = ?" if location and location in LOCATIONS else ""
+        query_last = f"SELECT MAX(last_at) FROM stats_rollup {last_where}"
+        cur = conn.execute(query_last, [location] if last_where else [])
         row = cur.fetchone()
-        if row:
+        if row and row[0]:
             stats["last_run"] = row[0]
 
     return stats
 
-def get_history(limit: int = 50, location: Optional[str] = None, only_failures: bool = False, page: int = 1, per_page: int = 25) -> List[Dict[str, Any]]:
-    """Fetch recent conversion history with filtering and pagination."""
+_FAILURE_FILTER = "status NOT IN ('SUCCESS', 'SKIPPED_DUP', 'ALREADY_DONE')"
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'<converted_at>:<id>' of the last row on the previous page; anything else means first page."""
+    try:
+        ts, row_id = (cursor or "").split(":")
+        return int(ts), int(row_id)
+    except ValueError:
+        return None
+
+# Duplicates pick up dimensions from the canonical SUCCESS row for their hash
+_HISTORY_SELECT = """
+    SELECT 
+        c.converted_at, c.src_name, 
+        COALESCE(c.orig_width, s.orig_width) as orig_width,
+        COALESCE(c.orig_height, s.orig_height) as orig_height,
+        COALESCE(c.new_width, s.new_width) as new_width,
+        COALESCE(c.new_height, s.new_height) as new_height,
+        c.status, c.saved_mb, c.duration_ms, c.error, c.src_fullpath, c.dst_fullpath,
+        c.src_size, c.out_size_bytes, s.src_fullpath as copied_from, c.id,
+        c.hash_ms, c.db_ms, c.probe_ms, c.render_ms, c.place_ms
+    FROM conversions c
+    LEFT JOIN canonical_success s ON c.src_hash = s.src_hash
+"""
+
+def _history_filters(location: Optional[str], only_failures: bool) -> Tuple[List[str], List[Any]]:
     where_clauses = ["1=1"]
     params = []
 
     if location and location in LOCATIONS:
-        folder_name = LOCATIONS[location]
         # Use table alias 'c'
-        where_clauses.append("c.src_fullpath LIKE ?")
-        params.append(f"%/{folder_name}/%")
+        where_clauses.append("c.location = ?")
+        params.append(location)
 
     if only_failures:
-        where_clauses.append("c.status != 'SUCCESS' AND c.status != 'SKIPPED_DUP' AND c.status != 'ALREADY_DONE'")
+        where_clauses.append("c." + _FAILURE_FILTER)
+
+    return where_clauses, params
+
+def _history_row(row) -> Dict[str, Any]:
+    return {
+        "id": row[15],
+        "timestamp": row[0],
+        "filename": row[1],
+        "original_size": f"{row[2]}x{row[3]}" if row[2] else "?",
+        "new_size": f"{row[4]}x{row[5]}" if row[4] else "?",
+        "orig_width": row[2],
+        "orig_height": row[3],
+        "new_width": row[4],
+        "new_height": row[5],
+        "status": row[6],
+        "saved_mb": row[7] if row[7] else 0.0,
+        "duration_ms": row[8],
+        "error": row[9],
+        "src_fullpath": row[10],
+        "dst_fullpath": row[11],
+        "src_size_bytes": row[12],
+        "out_size_bytes": row[13],
+        "copied_from": row[14],
+        # per-stage ms for the breakdown bar; None for rows recorded before stage timing existed
+        "stages": dict(zip(STAGES, row[16:21])) if any(v is not None for v in row[16:21]) else None
+    }
+
+def get_history(location: Optional[str] = None, only_failures: bool = False, before: Optional[Tuple[int, int]] = None, per_page: int = 25) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of conversion history, newest first, starting after the `before` cursor.
+    Returns (rows, cursor for the next page or None on the last page).
+    """
+    where_clauses, params = _history_filters(location, only_failures)
+
+    if before:
+        # Keyset pagination: seek straight to the cursor via the (location,) converted_at index
+        where_clauses.append("(c.converted_at, c.id) < (?, ?)")
+        params.extend(before)
 
     where_sql = " AND ".join(where_clauses)
-    
-    # Calculate offset for pagination
-    offset = (page - 1) * per_page
 
-    # Join with a subquery of unique successful conversions to get dimensions for duplicates
     query = f"""
-    SELECT 
-        c.converted_at, c.src_name, 
-        COALESCE(c.orig_width, s.orig_width) as orig_width,
-        COALESCE(c.orig_height, s.orig_height) as orig_height,
-        COALESCE(c.new_width, s.new_width) as new_width,
-        COALESCE(c.new_height, s.new_height) as new_height,
-        c.status, c.saved_mb, c.duration_ms, c.error, c.src_fullpath, c.dst_fullpath,
-        c.src_size, c.out_size_bytes, s.src_fullpath as copied_from
-    FROM conversions c
-    LEFT JOIN (
-        SELECT src_hash, orig_width, orig_height, new_width, new_height, src_fullpath
-        FROM conversions
-        WHERE status = 'SUCCESS'
-        GROUP BY src_hash
-    ) s ON c.src_hash = s.src_hash
+    {_HISTORY_SELECT}
     WHERE {where_sql}
-    ORDER BY c.converted_at DESC 
-    LIMIT ? OFFSET ?
+    ORDER BY c.converted_at DESC, c.id DESC
+    LIMIT ?
     """
-    params.extend([per_page, offset])
+    params.append(per_page + 1)  # one extra row tells us whether there is a next page
+
+    next_cursor = None
+    with db_pool.connection() as conn:
+        if not conn:
+            return [], None
+        cur = conn.execute(query, params)
+        rows = cur.fetchall()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = f"{rows[-1][0]}:{rows[-1][15]}"
+    return [_history_row(row) for row in rows], next_cursor
+
+def get_history_since(after_id: int, upto_id: int, location: Optional[str] = None, only_failures: bool = False, limit: int = 100) -> List[Dict[str, Any]]:
+    """Rows with after_id < id <= upto_id (the live feed's change cursor), oldest first."""
+    where_clauses, params = _history_filters(location, only_failures)
+    where_clauses.append("c.id > ? AND c.id <= ?")
+    params.extend([after_id, upto_id, limit])
 
-    history = []
-    with PhotoDB(DB_PATH, read_only=True) as db:
-        if not db.conn:
+    query = f"""
+    {_HISTORY_SELECT}
+    WHERE {" AND ".join(where_clauses)}
+    ORDER BY c.id
+    LIMIT ?
+    """
+    with db_pool.connection() as conn:
+        if not conn:
             return []
-        cur = db.conn.execute(query, params)
-        for row in cur.fetchall():
-            history.append({
-                "timestamp": row[0],
-                "filename": row[1],
-                "original_size": f"{row[2]}x{row[3]}" if row[2] else "?",
-                "new_size": f"{row[4]}x{row[5]}" if row[4] else "?",
-                "orig_width": row[2],
-                "orig_height": row[3],
-                "new_width": row[4],
-                "new_height": row[5],
-                "status": row[6],
-                "saved_mb": row[7] if row[7] else 0.0,
-                "duration_ms": row[8],
-                "error": row[9],
-                "src_fullpath": row[10],
-                "dst_fullpath": row[11],
-                "src_size_bytes": row[12],
-                "out_size_bytes": row[13],
-                "copied_from": row[14]
-            })
-    return history
+        return [_history_row(row) for row in conn.execute(query, params).fetchall()]
+
+def get_max_id() -> int:
+    with db_pool.connection() as conn:
+        if not conn:
+            return 0
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM conversions").fetchone()[0]
 
 def get_history_count(location: Optional[str] = None, only_failures: bool = False) -> int:
-    """Get total count of history records for pagination."""
+    """Total history records for pagination, read from the stats rollups."""
     where_clauses = ["1=1"]
     params = []
 
     if location and location in LOCATIONS:
-        folder_name = LOCATIONS[location]
-        where_clauses.append("src_fullpath LIKE ?")
-        params.append(f"%/{folder_name}/%")
+        where_clauses.append("location = ?")
+        params.append(location)
 
     if only_failures:
-        where_clauses.append("status != 'SUCCESS' AND status != 'SKIPPED_DUP' AND status != 'ALREADY_DONE'")
+        where_clauses.append(_FAILURE_FILTER)
 
     where_sql = " AND ".join(where_clauses)
 
-    query = f"SELECT COUNT(*) FROM conversions WHERE {where_sql}"
+    query = f"SELECT SUM(files) FROM stats_rollup WHERE {where_sql}"
     
-    with PhotoDB(DB_PATH, read_only=True) as db:
-        if not db.conn:
+    with db_pool.connection() as conn:
+        if not conn:
             return 0
-        cur = db.conn.execute(query, params)
+        cur = conn.execute(query, params)
         row = cur.fetchone()
-        return row[0] if row else 0
+        return (row[0] or 0) if row else 0
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -210,30 +312,100 @@ async def read_root(request: Request):
     })
 
 @app.get("/api/data")
-async def api_data(loc: str = None, failures: bool = False, page: int = 1, per_page: int = 25):
+async def api_data(loc: str = None, failures: bool = False, cursor: str = None, page: int = 1, per_page: int = 25):
     """
     API Query Params:
     - loc: Location slug (e.g., 'home')
     - failures: 'true' to show only failures/issues
-    - page: Page number (1-based)
+    - cursor: `next_cursor` from the previous page (omit for the newest page)
+    - page: Page number shown to the user (1-based; echoed back, the cursor decides the rows)
     - per_page: Items per page
     """
     # Convert 'null' or empty string to None
     location = loc if loc and loc != "null" else None
     
-    total_records = get_history_count(location=location, only_failures=failures)
-    total_pages = (total_records + per_page - 1) // per_page
+    def build() -> Dict[str, Any]:
+        total_records = get_history_count(location=location, only_failures=failures)
+        total_pages = (total_records + per_page - 1) // per_page
+        history, next_cursor = get_history(location=location, only_failures=failures,
+                                           before=parse_cursor(cursor), per_page=per_page)
+        
+        return {
+            "stats": get_stats(location=location),
+            "history": history,
+            "pagination": {
+                "current_page": page,
+                "per_page": per_page,
+                "total_records": total_records,
+                "total_pages": total_pages,
+                "next_cursor": next_cursor
+            }
+        }
     
-    return {
-        "stats": get_stats(location=location),
-        "history": get_history(location=location, only_failures=failures, page=page, per_page=per_page),
-        "pagination": {
-            "current_page": page,
-            "per_page": per_page,
-            "total_records": total_records,
-            "total_pages": total_pages
+    # data_version check and the queries run off the event loop, like the SSE feed's
+    return await run_in_threadpool(
+        response_cache.get_or_compute, ("data", location, failures, cursor, page, per_page), build)
+
+STREAM_CHECK_SECS = 1.0       # how often the feed looks at PRAGMA data_version
+STREAM_KEEPALIVE_SECS = 15.0  # comment line so proxies don't drop an idle feed
+STREAM_BATCH = 100            # rows per `rows` event
+
+def _sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/api/stream")
+async def api_stream(request: Request, loc: str = None, failures: bool = False, last_id: int = None):
+    """
+    Server-Sent Events live feed.
+    - `rows`: conversions written after the client's cursor, oldest first. The event id is the
+      newest conversions.id seen, so a reconnect resumes from Last-Event-ID.
+    - `stats`: the refreshed stats card plus total_records, after anything was written.
+    Idle feeds cost one PRAGMA data_version per second and a keepalive comment.
+    """
+    location = loc if loc and loc != "null" else None
+    header_id = request.headers.get("last-event-id", "")
+    cursor = int(header_id) if header_id.isdigit() else last_id
+    if cursor is None:
+        cursor = await run_in_threadpool(get_max_id)
+
+    def stats_payload() -> Dict[str, Any]:
+        return {
+            "stats": get_stats(location=location),
+            "total_records": get_history_count(location=location, only_failures=failures),
         }
-    }
+
+    async def events():
+        nonlocal cursor
+        version = await run_in_threadpool(db_pool.data_version)
+        quiet = 0.0
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            await asyncio.sleep(STREAM_CHECK_SECS)
+            current = await run_in_threadpool(db_pool.data_version)
+            if current == version:
+                quiet += STREAM_CHECK_SECS
+                if quiet >= STREAM_KEEPALIVE_SECS:
+                    quiet = 0.0
+                    yield ": keepalive\n\n"
+                continue
+            version, quiet = current, 0.0
+
+            upto = await run_in_threadpool(get_max_id)
+            while cursor < upto:
+                rows = await run_in_threadpool(get_history_since, cursor, upto, location, failures, STREAM_BATCH)
+                # rows filtered out by loc/failures still move the cursor once this batch is the last
+                cursor = rows[-1]["id"] if len(rows) == STREAM_BATCH else upto
+                if rows:
+                    yield _sse("rows", rows, cursor)
+            payload = await run_in_threadpool(
+                response_cache.get_or_compute, ("stats", location, failures), stats_payload)
+            yield _sse("stats", payload, cursor)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # let nginx pass events through immediately
+    })
 
 @app.get("/api/image")
 async def serve_image(path: str):
@@ -284,19 +456,110 @@ async def serve_image(path: str):
             content={"error": str(e)}
         )
 
-@app.post("/api/retry")
-async def retry_conversion(request: Request):
+@app.get("/api/thumb")
+def serve_thumb(request: Request, path: str, w: int = 320, fmt: str = "jpeg"):
     """
-    Retry a failed conversion.
-    Expects JSON: {"file_path": "/full/path/to/image.jpg"}
+    Serve a small JPEG/WebP preview of an image, rendered once and cached on disk.
+    Same access rules as /api/image; answers 304 when the browser's copy is current.
+    (Plain def: rendering blocks, so FastAPI runs it in its threadpool.)
     """
-    import time
-    from app.config import BASE, EXTS, RESIZE_WIDTH, RESIZE_HEIGHT, IM_QUALITY, TIMEOUT_SECS
+    try:
+        file_path = Path(path).resolve()
+        
+        # Security: Ensure path is under BASE directory
+        try:
+            file_path.relative_to(BASE)
+        except ValueError:
+            return JSONResponse(
+                status_code=403,
+                content={"error": "Access denied: path outside allowed directory"}
+            )
+        
+        if file_path.suffix.lower() not in EXTS:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Invalid file type: {file_path.suffix}"}
+            )
+        
+        if fmt not in THUMB_FORMATS:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Invalid format: {fmt}"}
+            )
+        
+        if not file_path.exists():
+            return JSONResponse(
+                status_code=404,
+                content={"error": "File not found"}
+            )
+        
+        # Snap to 64px steps (max 1024) so clients can't fill the cache with near-identical sizes
+        width = min(max(64, (w + 63) // 64 * 64), 1024)
+        st = file_path.stat()
+        key = ThumbCache.key(file_path, st, width, fmt)
+        headers = {
+            "ETag": f'"{key}"',
+            "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+            "Cache-Control": "private, max-age=86400",
+        }
+        
+        # Conditional GET: the key already covers path, mtime, size, width and format
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            if f'"{key}"' in if_none_match or if_none_match.strip() == "*":
+                return Response(status_code=304, headers=headers)
+        elif request.headers.get("if-modified-since"):
+            try:
+                since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+                if int(st.st_mtime) <= since:
+                    return Response(status_code=304, headers=headers)
+            except (TypeError, ValueError):
+                pass
+        
+        thumb_path = thumbs.get(file_path, key, width, fmt)
+        return FileResponse(
+            path=str(thumb_path),
+            media_type=THUMB_FORMATS[fmt][1],
+            headers=headers
+        )
+        
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": str(e)}
+        )
+
+def _make_converter():
+    """Converter for dashboard jobs (same setup as main.py), built once by the job queue."""
+    from app.config import IM_QUALITY, TIMEOUT_SECS, ENGINE, SCAN_MANIFEST_DIR
     from app.planner import Planner
-    from app.imaging import ImageEngine
+    from app.imaging import make_engine
     from app.converter import Converter
     from app.logging_setup import configure_logging
     
+    make_logger = configure_logging(
+        level="INFO",
+        service_name="photo-resizer-retry",
+        to_stderr=False,
+        to_journal=False,
+    )
+    planner = Planner(BASE, LOCATIONS, EXTS, manifest_dir=SCAN_MANIFEST_DIR)
+    engine = make_engine(ENGINE, timeout=TIMEOUT_SECS, quality=IM_QUALITY)
+    return Converter(planner, engine, DB_PATH, make_logger=make_logger)
+
+jobs = JobQueue(_make_converter, DB_PATH)
+
+@app.on_event("shutdown")
+def _stop_jobs():
+    jobs.close()
+
+@app.post("/api/retry")
+async def retry_conversion(request: Request):
+    """
+    Queue a retry of one failed conversion; returns immediately with a job id.
+    Expects JSON: {"file_path": "/full/path/to/image.jpg"}
+    Poll /api/jobs/{job_id} for the outcome.
+    """
     try:
         body = await request.json()
         file_path_str = body.get("file_path")
@@ -313,51 +576,49 @@ async def retry_conversion(request: Request):
         if file_path.suffix.lower() not in EXTS:
             return {"success": False, "message": f"Invalid file type: {file_path.suffix}"}
         
-        # Determine location from path
-        location_key = None
-        for key, name in LOCATIONS.items():
-            if f"/{name}/" in str(file_path):
-                location_key = key
-                break
-        
-        if not location_key:
-            return {"success": False, "message": "Could not determine location from path"}
-        
-        # Setup converter (same as main.py)
-        make_logger = configure_logging(
-            level="INFO",
-            service_name="photo-resizer-retry",
-            to_stderr=False,
-            to_journal=False,
-        )
-        
-        planner = Planner(BASE, LOCATIONS, EXTS)
-        engine = ImageEngine(timeout=TIMEOUT_SECS, quality=IM_QUALITY)
-        converter = Converter(planner, engine, DB_PATH, make_logger=make_logger)
-        
-        # Get paths using dirs_for_location
-        watch_dir, out_dir = planner.dirs_for_location(location_key)
-        
-        # Open DB for writing
-        with PhotoDB(DB_PATH, read_only=False) as db:
-            # Run conversion
-            duration = converter.process_one(
-                db=db,
-                idx=1,
-                total=1,
-                full_path=file_path,
-                watch_dir=watch_dir,
-                out_dir=out_dir
-            )
+        job = await run_in_threadpool(jobs.submit, "retry", [str(file_path)])
+        return {"success": True, "message": "Retry queued", "job_id": job.id}
         
+    except Exception as e:
         return {
-            "success": True,
-            "message": f"Conversion completed in {duration}s",
-            "duration": duration
+            "success": False,
+            "message": f"Retry failed: {str(e)}"
         }
+
+@app.post("/api/retry-failed")
+async def retry_failed(request: Request):
+    """
+    Queue retries for every source whose latest conversion FAILED.
+    Expects JSON: {"location": "home"} (omit or null for all locations)
+    """
+    try:
+        body = await request.json()
+        location = body.get("location") or None
+        if location and location not in LOCATIONS:
+            return {"success": False, "message": f"Unknown location: {location}"}
+        
+        def failed_sources() -> List[str]:
+            with PhotoDB(DB_PATH, read_only=True) as db:
+                return db.failed_sources(location)
+        
+        paths = await run_in_threadpool(failed_sources)
+        job = await run_in_threadpool(jobs.submit, "retry_failed", paths)
+        return {"success": True, "message": f"Queued {len(paths)} retries", "job_id": job.id, "total": len(paths)}
         
     except Exception as e:
         return {
             "success": False,
             "message": f"Retry failed: {str(e)}"
         }
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """Recent dashboard jobs, newest first."""
+    return {"jobs": [job.to_dict() for job in jobs.recent()]}
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: int):
+    job = jobs.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": "Unknown job"})
+    return job.to_dict()
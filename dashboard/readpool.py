@@ -0,0 +1,86 @@
+from __future__ import annotations
+import queue, sqlite3, threading, time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+
+class ReadPool:
+    """
+    A few read-only SQLite connections shared by all dashboard requests (opened lazily, reused LIFO),
+    plus one probe connection whose PRAGMA data_version changes whenever another connection
+    (the converter) commits. `on_release`, if given, gets the seconds each borrowed connection was held
+    (i.e. SQL time) when it is handed back.
+    """
+
+    def __init__(self, db_path: Path, size: int = 4, on_release: Optional[Callable[[float], None]] = None):
+        self.path = Path(db_path)
+        self.on_release = on_release
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._probe: Optional[sqlite3.Connection] = None
+        self._probe_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    @contextmanager
+    def connection(self) -> Iterator[Optional[sqlite3.Connection]]:
+        """Borrow a connection; yields None while the database does not exist yet."""
+        if not self.path.exists():
+            yield None
+            return
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            t0 = time.perf_counter()
+            try:
+                yield conn
+            except sqlite3.DatabaseError:
+                conn.close()  # don't hand a possibly broken connection to the next request
+                raise
+            else:
+                self._idle.put(conn)
+            finally:
+                if self.on_release:
+                    self.on_release(time.perf_counter() - t0)
+
+    def data_version(self) -> Optional[int]:
+        """Changes after every commit by another connection; None while there is no database."""
+        if not self.path.exists():
+            return None
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = self._connect()
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+
+class VersionedCache:
+    """Computed responses keyed by request parameters, all dropped when the database's data_version moves."""
+
+    def __init__(self, pool: ReadPool, maxsize: int = 128):
+        self.pool = pool
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._entries: OrderedDict = OrderedDict()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        version = self.pool.data_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()  # read after the version check, so it is at least as new as `version`
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
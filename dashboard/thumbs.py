@@ -0,0 +1,113 @@
+from __future__ import annotations
+import hashlib, os, subprocess, threading
+from pathlib import Path
+from typing import Optional
+
+from app.imaging import find_imagemagick, pillow_can_open
+
+# fmt -> (file suffix, media type, Pillow format)
+THUMB_FORMATS = {
+    "jpeg": (".jpg", "image/jpeg", "JPEG"),
+    "webp": (".webp", "image/webp", "WEBP"),
+}
+
+
+class ThumbCache:
+    """
+    Small previews rendered once and kept on disk, keyed by source path + mtime + size + width + format,
+    so an edited original gets a new thumbnail and the old one simply ages out. Each hit bumps the
+    file's mtime; when the cache grows past max_bytes the least recently used files are deleted.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, quality: int = 80, timeout: int = 60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._rendering: dict[str, threading.Lock] = {}
+        self._size: Optional[int] = None  # bytes on disk, counted on first use
+
+    @staticmethod
+    def key(src: Path, st: os.stat_result, width: int, fmt: str) -> str:
+        raw = f"{src}\0{st.st_mtime_ns}\0{st.st_size}\0{width}\0{fmt}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.root / key[:2] / f"{key}{THUMB_FORMATS[fmt][0]}"
+
+    def get(self, src: Path, key: str, width: int, fmt: str) -> Path:
+        """Cached thumbnail for `key`, rendering it first if needed."""
+        dst = self.path_for(key, fmt)
+        with self._lock:
+            render_lock = self._rendering.setdefault(key, threading.Lock())
+        with render_lock:  # concurrent requests for the same preview render it once
+            try:
+                if dst.exists():
+                    os.utime(dst)  # LRU: most recently used = newest mtime
+                    return dst
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}")
+                try:
+                    self._render(src, tmp, width, fmt)
+                    os.replace(tmp, dst)
+                finally:
+                    tmp.unlink(missing_ok=True)
+            finally:
+                with self._lock:
+                    self._rendering.pop(key, None)
+        self._added(dst.stat().st_size)
+        return dst
+
+    def _render(self, src: Path, dst: Path, width: int, fmt: str) -> None:
+        if pillow_can_open(src):
+            from PIL import Image, ImageOps  # installed, or pillow_can_open would be False
+            with Image.open(src) as im:
+                if im.format == "JPEG":
+                    im.draft("RGB", (width, width))  # decode at 1/2..1/8 scale
+                im = ImageOps.exif_transpose(im)
+                im.thumbnail((width, width), Image.LANCZOS)
+                if im.mode not in ("RGB", "L"):
+                    im = im.convert("RGB")
+                im.save(dst, THUMB_FORMATS[fmt][2], quality=self.quality)
+            return
+
+        magick, convert, _ = find_imagemagick()
+        if not (magick or convert):
+            raise RuntimeError("ImageMagick not found. Need either 'magick' or 'convert' in PATH for thumbnails.")
+        argv = [magick or convert, "-define", f"jpeg:size={width * 2}x{width * 2}", f"{src}[0]", "-auto-orient",
+                "-thumbnail", f"{width}x{width}>", "-quality", str(self.quality),
+                f"{fmt}:{dst}"]
+        subprocess.run(argv, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=self.timeout)
+
+    def _added(self, nbytes: int) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(f.stat().st_size for f in self.root.rglob("*") if f.is_file())
+            else:
+                self._size += nbytes
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used thumbnails until the cache is back under 90% of the cap."""
+        files = []
+        for f in self.root.rglob("*"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            if f.is_file() and not f.name.startswith("."):  # skip renders in progress
+                files.append((st.st_mtime, st.st_size, f))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, f in files:
+            if total <= target:
+                break
+            try:
+                f.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._size = total
@@ -1,31 +1,95 @@
 from __future__ import annotations
 import argparse
+import contextlib
 import os
+import signal
+from pathlib import Path
 
 from app.config import (
     LOCATIONS, BASE, EXTS, RESIZE_WIDTH, RESIZE_HEIGHT,
-    IM_QUALITY, DB_PATH, TIMEOUT_SECS
+    IM_QUALITY, DB_PATH, TIMEOUT_SECS, PARANOID_SLICES, WORKERS, ENGINE,
+    HASH_ALGO, SCAN_MANIFEST_DIR, WATCH_SETTLE_SECS, WATCH_RECONCILE_SECS, WATCH_POLL_SECS,
+    METRICS_TEXTFILE, PROFILE_DIR, CLAIM_TTL_SECS,
 )
 from app.planner import Planner
-from app.imaging import ImageEngine
+from app.imaging import make_engine
 from app.converter import Converter
+from app.hashing import HASH_ALGOS
+from app.metrics import textfile_path
+from app.profiling import RunProfiler, report_dir_for
+from app.watcher import WatchDaemon
 from app.logging_setup import configure_logging  # <- add this module as shown earlier
 
 
 def parse_args():
     ap = argparse.ArgumentParser(description="Convert (or skip by hash) + log to SQLite.")
     ap.add_argument("location", choices=list(LOCATIONS.keys()), nargs="?", default="home")
+    ap.add_argument(
+        "--all", action="store_true",
+        help="Process every location in one run (shared dedupe index, files interleaved across locations)",
+    )
     ap.add_argument(
         "--log-level",
         default=os.getenv("LOG_LEVEL", "INFO"),
         choices=["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG", "NOTSET"],
         help="Logging verbosity (default: %(default)s)",
     )
+    ap.add_argument(
+        "--paranoid", type=int, default=PARANOID_SLICES, metavar="N",
+        help="Re-hash 1/N of stat-unchanged originals per run, rotating daily (0 = trust stat; default: %(default)s)",
+    )
+    ap.add_argument(
+        "--workers", type=int, default=int(os.getenv("WORKERS", WORKERS)), metavar="N",
+        help="Convert N files in parallel (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--engine", choices=["magick", "pillow"], default=os.getenv("ENGINE", ENGINE),
+        help="Imaging backend (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--hash-algo", choices=list(HASH_ALGOS), default=os.getenv("HASH_ALGO", HASH_ALGO),
+        help="Content hash for newly seen files. Rows hashed otherwise stay valid: a new file whose size and "
+             "quick fingerprint match one is hashed with that row's algorithm (default: %(default)s)",
+    )
+    ap.add_argument(
+        "--claim-ttl", type=int, default=int(os.getenv("CLAIM_TTL_SECS", CLAIM_TTL_SECS)), metavar="SECS",
+        help="Lease files in the DB while working on them so overlapping runs and other nodes skip them; "
+             "a crashed worker's files are taken over after SECS (0 = off; default: %(default)s)",
+    )
+    ap.add_argument(
+        "--watch", action="store_true",
+        help="Keep running: convert new files as they arrive (inotify) instead of one pass",
+    )
+    ap.add_argument(
+        "--watch-poll", action="store_true",
+        help="With --watch, poll the tree instead of inotify (e.g. files arrive via another NFS client)",
+    )
+    ap.add_argument(
+        "--metrics-textfile", default=os.getenv("METRICS_TEXTFILE", METRICS_TEXTFILE), metavar="PATH",
+        help="Write Prometheus metrics here for node-exporter's textfile collector; '{location}' is "
+             "replaced by the location (default: off)",
+    )
+    ap.add_argument(
+        "--profile", nargs="?", const=str(PROFILE_DIR), metavar="DIR",
+        help="Profile the run (cProfile, sampled stacks, ImageMagick timings, slowest files) "
+             "and write a report under DIR (default: %(const)s)",
+    )
+    ap.add_argument(
+        "--profile-top", type=int, default=20, metavar="N",
+        help="With --profile, list the N slowest files and ImageMagick calls (default: %(default)s)",
+    )
     return ap.parse_args()
 
 
+def _exit_on_signal(signum, frame):
+    # unwind through the context managers so buffered DB rows get flushed
+    raise SystemExit(128 + signum)
+
+
 def main():
     args = parse_args()
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, _exit_on_signal)
 
     # one-time logging setup; returns a logger factory
     make_logger = configure_logging(
@@ -35,11 +99,28 @@ def main():
         to_journal=True,
     )
 
-    planner = Planner(BASE, LOCATIONS, EXTS)
-    engine = ImageEngine(timeout=TIMEOUT_SECS, quality=IM_QUALITY)
+    location_keys = list(LOCATIONS) if args.all else [args.location]
+    label = "all" if args.all else args.location
+
+    planner = Planner(BASE, LOCATIONS, EXTS, manifest_dir=SCAN_MANIFEST_DIR)
+    engine = make_engine(args.engine, timeout=TIMEOUT_SECS, quality=IM_QUALITY)
 
     # pass the factory into your classes (Converter updated to accept make_logger=)
-    Converter(planner, engine, DB_PATH, make_logger=make_logger).run(args.location)
+    converter = Converter(planner, engine, DB_PATH, make_logger=make_logger,
+                          paranoid_slices=args.paranoid, workers=args.workers, hash_algo=args.hash_algo,
+                          metrics_textfile=textfile_path(args.metrics_textfile, label), claim_ttl=args.claim_ttl)
+    profiler = contextlib.nullcontext()
+    if args.profile:
+        profiler = RunProfiler(report_dir_for(Path(args.profile), label), top_n=args.profile_top,
+                               log=make_logger("profile"))
+        profiler.attach(converter)
+    with profiler:
+        if args.watch:
+            WatchDaemon(converter, planner, location_keys, make_logger,
+                        settle_secs=WATCH_SETTLE_SECS, reconcile_secs=WATCH_RECONCILE_SECS,
+                        poll_secs=WATCH_POLL_SECS, force_poll=args.watch_poll).run_forever()
+        else:
+            converter.run_all(location_keys)
 
 
 if __name__ == "__main__":
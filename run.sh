@@ -1,16 +1,19 @@
 #!/usr/bin/env bash
 set -Eeuo pipefail
 
-# Usage: run-resizer.sh <profile>
+# Usage: run-resizer.sh <profile> [main.py options...]
 # Examples:
 #   run.sh home
 #   run.sh batanovs
 #   run.sh cherednychok
+#   run.sh all            # every location in one process (main.py --all)
+#   run.sh all --watch    # extra options go to main.py (used by photo-resizer-watch@.service)
 
 if [[ $# -lt 1 ]]; then
   echo "Error: missing profile. Usage: $0 <profile>"; exit 2
 fi
 PROFILE="$1"
+shift
 
 # Resolve repo root no matter where cron runs from
 SCRIPT_DIR="$(cd -- "$(dirname -- "${BASH_SOURCE[0]}")" >/dev/null 2>&1 && pwd)"
@@ -27,4 +30,7 @@ if [[ ! -x "$PY" ]]; then
 fi
 
 # Run your app (change app.py → main.py if you renamed it)
-exec "$PY" main.py "$PROFILE"
+if [[ "$PROFILE" == "all" ]]; then
+  exec "$PY" main.py --all "$@"
+fi
+exec "$PY" main.py "$PROFILE" "$@"
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for Photo Resizer
+
+Usage:
+    python3 scripts/benchmark.py [--files N] [--scale S] [--engine magick|pillow] [--workers N]
+                                 [--baseline PATH] [--save-baseline] [--json PATH]
+
+This script:
+1. Builds a deterministic synthetic corpus in a temp BASE (same seed = same bytes): large and
+   small JPEGs, PNG, TIFF, EXIF-rotated JPEGs, duplicates across locations, HEIC if pillow-heif
+   can write it.
+2. Times the primitives on every file: header probe, content hash per algorithm, engine render
+   (best of --repeat passes).
+3. Times Converter.run over all locations on a throwaway DB: cold (everything converts) and
+   warm (everything is already done).
+4. Reports files/s, MB/s (source bytes) and peak RSS per stage, and compares files/s with a
+   stored baseline JSON. Exit code 1 when any stage is slower than the baseline by more than
+   --tolerance. Baselines are per machine: record one with --save-baseline on the host you
+   compare on (the default path is git-ignored).
+
+Peak RSS is the high-water mark of this process so far (ru_maxrss can't be reset between stages);
+"children" is the largest ImageMagick subprocess seen so far.
+"""
+import sys
+import argparse
+import io
+import json
+import platform
+import random
+import resource
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+# Fix python path to allow imports from app
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import LOCATIONS, EXTS, RESIZE_WIDTH, RESIZE_HEIGHT, IM_QUALITY, TIMEOUT_SECS
+from app.planner import Planner
+from app.imaging import make_engine
+from app.probe import probe
+from app.hashing import HASH_ALGOS, hash_file
+from app.converter import Converter
+from app.logging_setup import configure_logging
+
+try:
+    from PIL import Image  # pip: Pillow
+    _HAS_PIL = True
+except Exception:
+    _HAS_PIL = False
+
+try:
+    from pillow_heif import register_heif_opener  # pip: pillow-heif
+    register_heif_opener()
+    _HAS_HEIF = True
+except Exception:
+    _HAS_HEIF = False
+
+DEFAULT_BASELINE = SCRIPT_DIR / "benchmark_baseline.json"
+_EXIF_ORIENTATION = 0x0112
+
+# (name, width, height, format, exif orientation, share of the corpus)
+_KINDS = [
+    ("big", 6000, 4000, "JPEG", 1, 0.35),
+    ("mid", 4032, 3024, "JPEG", 1, 0.20),
+    ("rot6", 4032, 3024, "JPEG", 6, 0.10),
+    ("rot8", 3024, 4032, "JPEG", 8, 0.05),
+    ("small", 1024, 768, "JPEG", 1, 0.10),   # fits already: byte-copy path
+    ("png", 2560, 1600, "PNG", 1, 0.08),
+    ("tiff", 3000, 2000, "TIFF", 1, 0.07),
+    ("heic", 4032, 3024, "HEIF", 1, 0.05),
+]
+_SUFFIX = {"JPEG": ".jpg", "PNG": ".png", "TIFF": ".tif", "HEIF": ".heic"}
+
+
+def _can_write_heif() -> bool:
+    if not _HAS_HEIF:
+        return False
+    try:
+        Image.new("RGB", (16, 16)).save(io.BytesIO(), "HEIF")
+        return True
+    except Exception:
+        return False
+
+
+def _synthetic_image(rng: random.Random, w: int, h: int):
+    """Smooth, photo-like content: random low-res colour field upscaled (deterministic for a seed)."""
+    seed = Image.frombytes("RGB", (48, 32), bytes(rng.getrandbits(8) for _ in range(48 * 32 * 3)))
+    return seed.resize((w, h), Image.BICUBIC)
+
+
+def build_corpus(base: Path, files: int, scale: float, seed: int) -> dict:
+    """Write the corpus under base/<Folder>/Original; ~10% of files are duplicated into other locations."""
+    rng = random.Random(seed)
+    kinds = [k for k in _KINDS if k[3] != "HEIF" or _can_write_heif()]
+    total_share = sum(k[5] for k in kinds)
+    folders = list(LOCATIONS.values())
+    written: list[Path] = []
+    for name, w, h, fmt, orientation, share in kinds:
+        count = max(1, round(files * share / total_share))
+        sw, sh = max(64, int(w * scale)), max(64, int(h * scale))
+        for i in range(count):
+            folder = folders[len(written) % len(folders)]
+            dst = base / folder / "Original" / f"{i // 50:03d}" / f"{name}_{i:04d}{_SUFFIX[fmt]}"
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            im = _synthetic_image(rng, sw, sh)
+            kwargs = {"quality": 90} if fmt in ("JPEG", "HEIF") else {}
+            if orientation != 1:
+                exif = Image.Exif()
+                exif[_EXIF_ORIENTATION] = orientation
+                kwargs["exif"] = exif.tobytes()
+            im.save(dst, fmt, **kwargs)
+            written.append(dst)
+
+    for src in rng.sample(written, max(1, len(written) // 10)):
+        folder = rng.choice([f for f in folders if f != src.parts[-4]])
+        dst = base / folder / "Original" / "shared" / src.name
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dst)
+        written.append(dst)
+
+    return {
+        "files": len(written),
+        "bytes": sum(p.stat().st_size for p in written),
+        "kinds": [k[0] for k in kinds],
+    }
+
+
+def _rss_mb(who) -> float:
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)  # ru_maxrss is KiB on Linux
+
+
+def timed(fn, files: int, nbytes: int, repeat: int = 1) -> dict:
+    """Run fn `repeat` times and report the fastest pass as a result row."""
+    secs = min(_wall(fn) for _ in range(max(1, repeat)))
+    return {
+        "files": files,
+        "secs": round(secs, 3),
+        "files_per_s": round(files / max(secs, 1e-9), 2),
+        "mb_per_s": round(nbytes / max(secs, 1e-9) / (1024 * 1024), 2),
+        "peak_rss_mb": _rss_mb(resource.RUSAGE_SELF),
+        "children_peak_rss_mb": _rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def _wall(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def run_benchmarks(base: Path, work: Path, engine_kind: str, workers: int, repeat: int) -> dict:
+    planner = Planner(base, LOCATIONS, EXTS)
+    sources = sorted(p for key in LOCATIONS for p in planner.iter_candidates(planner.dirs_for_location(key)[0]))
+    nbytes = sum(p.stat().st_size for p in sources)
+    stages: dict = {}
+
+    def probe_all():
+        for p in sources:
+            probe(p)
+    stages["probe"] = timed(probe_all, len(sources), nbytes, repeat)
+
+    for algo in HASH_ALGOS:
+        def hash_all():
+            for p in sources:
+                hash_file(p, algo)
+        try:
+            stages[f"hash_{algo}"] = timed(hash_all, len(sources), nbytes, repeat)
+        except SystemExit:
+            continue  # e.g. xxh3 without the xxhash package
+
+    engine = make_engine(engine_kind, timeout=TIMEOUT_SECS, quality=IM_QUALITY)
+    out = work / "render"
+    out.mkdir()
+
+    def render_all():
+        for i, p in enumerate(sources):
+            engine.render(p, out / f"{i}{planner.mapped_ext(p.suffix)}", RESIZE_WIDTH, RESIZE_HEIGHT)
+    stages[f"render_{engine_kind}"] = timed(render_all, len(sources), nbytes, repeat)
+
+    make_logger = configure_logging(level="WARNING", service_name="photo-resizer-bench",
+                                    to_stderr=True, to_journal=False)
+    db_path = work / "bench.db"
+    for label in ("cold", "warm"):
+        converter = Converter(planner, engine, db_path, make_logger=make_logger,
+                              workers=workers, store_dir=work / ".store")
+
+        def run_all():
+            for key in LOCATIONS:
+                converter.run(key)
+        stages[f"run_{label}"] = timed(run_all, len(sources), nbytes)  # stateful: one pass only
+        converter.hasher.close()
+
+    return stages
+
+
+def compare(stages: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a table against the baseline; return the names of stages that regressed."""
+    regressed = []
+    base_stages = baseline.get("stages", {})
+    print(f"\n{'stage':<16} {'files/s':>10} {'MB/s':>9} {'RSS MB':>8} {'baseline':>10} {'change':>8}")
+    for name, r in stages.items():
+        b = base_stages.get(name)
+        change = ""
+        if b and b.get("files_per_s"):
+            delta = (r["files_per_s"] - b["files_per_s"]) / b["files_per_s"]
+            change = f"{delta:+.1%}"
+            if delta < -tolerance:
+                regressed.append(name)
+                change += " !"
+        print(f"{name:<16} {r['files_per_s']:>10.2f} {r['mb_per_s']:>9.2f} {r['peak_rss_mb']:>8.1f} "
+              f"{(b or {}).get('files_per_s', '-'):>10} {change:>8}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Photo Resizer on a synthetic corpus.")
+    parser.add_argument("--files", type=int, default=60, help="Approximate corpus size before duplicates")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale image dimensions (e.g. 0.25 for a quick run)")
+    parser.add_argument("--seed", type=int, default=1234, help="Corpus seed")
+    parser.add_argument("--engine", choices=["magick", "pillow"], default="magick", help="Imaging backend")
+    parser.add_argument("--workers", type=int, default=1, help="Converter workers for the run_* stages")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per primitive stage (fastest is kept)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed files/s drop before flagging")
+    parser.add_argument("--json", help="Also write the results to this path")
+    parser.add_argument("--keep", action="store_true", help="Keep the temp corpus directory")
+    args = parser.parse_args()
+
+    if not _HAS_PIL:
+        raise SystemExit("Pillow not installed. Need 'pip install Pillow' to build the benchmark corpus.")
+
+    tmp = Path(tempfile.mkdtemp(prefix="photo-resizer-bench-"))
+    try:
+        base, work = tmp / "base", tmp / "work"
+        work.mkdir(parents=True)
+        t0 = time.perf_counter()
+        corpus = build_corpus(base, args.files, args.scale, args.seed)
+        print(f"Corpus: {corpus['files']} files, {corpus['bytes'] / (1024 * 1024):.1f} MB "
+              f"({', '.join(corpus['kinds'])}) built in {time.perf_counter() - t0:.1f}s in {tmp}")
+
+        results = {
+            "meta": {
+                "files": corpus["files"],
+                "bytes": corpus["bytes"],
+                "scale": args.scale,
+                "seed": args.seed,
+                "engine": args.engine,
+                "workers": args.workers,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "created_at": int(time.time()),
+            },
+            "stages": run_benchmarks(base, work, args.engine, args.workers, args.repeat),
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    same_setup = all(baseline.get("meta", {}).get(k) == results["meta"][k]
+                     for k in ("files", "scale", "seed", "engine", "workers"))
+    if baseline and not same_setup:
+        print(f"Note: baseline {baseline_path} was made with different settings; comparison is indicative only.")
+    regressed = compare(results["stages"], baseline, args.tolerance)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"Saved baseline to {baseline_path}")
+    if regressed and not args.save_baseline:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,9 @@ This script:
 2. Finds valid 'SUCCESS' records for each (src_hash, dst_fullpath).
 3. Updates their `last_checked_at` with the latest timestamp from any duplicate `ALREADY_DONE` records.
 4. Deletes the redundant records.
-5. Vacuums the database.
+5. Rebuilds the dashboard stats rollups (counts changed).
+6. Vacuums the database.
+7. With --prune-store, removes output store entries no Resized/ file links to any more.
 """
 import sys
 import argparse
@@ -25,9 +27,10 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 # Import default from config
 try:
-    from app.config import DB_PATH
+    from app.config import DB_PATH, OUTPUT_STORE_DIR
 except ImportError:
     DB_PATH = "photo_conversions.db" # Fallback
+    OUTPUT_STORE_DIR = None
 
 def cleanup(db_path_str: str):
     path = Path(db_path_str)
@@ -108,6 +111,10 @@ def cleanup(db_path_str: str):
             conn.commit()
 
     conn.commit()
+    print("Rebuilding stats rollups...")
+    from app.database_operations import PhotoDB
+    with PhotoDB(path) as db:
+        db.rebuild_rollups()
     print("Vacuuming database...")
     conn.execute("VACUUM")
     conn.close()
@@ -116,9 +123,15 @@ def cleanup(db_path_str: str):
 def main():
     parser = argparse.ArgumentParser(description="Cleanup duplicates in photo database.")
     parser.add_argument("db_path", nargs="?", default=str(DB_PATH), help="Path to sqlite database")
+    parser.add_argument("--prune-store", action="store_true", help="Also drop orphaned output store entries")
     args = parser.parse_args()
     
     cleanup(args.db_path)
 
+    if args.prune_store and OUTPUT_STORE_DIR:
+        from app.store import OutputStore
+        removed = OutputStore(Path(OUTPUT_STORE_DIR)).prune()
+        print(f"Removed {removed} orphaned store entries from {OUTPUT_STORE_DIR}.")
+
 if __name__ == "__main__":
     main()
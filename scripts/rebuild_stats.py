@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Rebuild the dashboard's stats rollups for Photo Resizer
+
+Usage:
+    python3 scripts/rebuild_stats.py [db_path]
+
+PhotoDB keeps the `stats_rollup` table current on every write. Run this after
+deleting or editing `conversions` rows by hand to recompute it from scratch.
+"""
+import sys
+import argparse
+import time
+from pathlib import Path
+
+# Fix python path to allow imports from app
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import DB_PATH
+from app.database_operations import PhotoDB
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute per-location/status stats rollups.")
+    parser.add_argument("db_path", nargs="?", default=str(DB_PATH), help="Path to sqlite database")
+    args = parser.parse_args()
+
+    path = Path(args.db_path)
+    if not path.exists():
+        print(f"Error: Database not found at {path}")
+        return
+
+    t0 = time.time()
+    with PhotoDB(path) as db:
+        db.rebuild_rollups()
+        rows = db.conn.execute("SELECT location, status, files FROM stats_rollup ORDER BY 1, 2").fetchall()
+    for location, status, files in rows:
+        print(f"{location or '(unknown)':<16} {status:<14} {files}")
+    print(f"Rebuilt {len(rows)} rollup rows in {time.time() - t0:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()